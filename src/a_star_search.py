@@ -1,5 +1,5 @@
-from collections import deque
-from sortedcontainers import SortedList
+from priority_queue import PriorityQueue
+from heuristics import distances
 
 
 def a_star_search(start):
@@ -7,47 +7,51 @@ def a_star_search(start):
     if (yield) == -1:
         return
     
-    # Keep track of distance from initial to current node in a lookup
-    costs       = { start: 0 }
+    # Keep track of distance from initial to current node in a lookup, by node.key() so that a child node
+    # is only built for a successor that is new or reached more cheaply
+    costs       = { start.key(): 0 }
 
     # Maintain a priority queue where the priority is based on a estimated total cost of a path that passes through the node
-    priority    = { start: 0 }
-    queue       = SortedList([start], key = lambda x: priority[x] )
+    queue       = PriorityQueue()
+    queue.push(start, 0)
 
     # Maintain a visited set to prevent going in circles
-    visited     = set()
+    visited     = {}
 
     # While there's something to explore
     while len(queue) > 0:
 
         # Pop the item with lowest priority (bets estimated total path length from initial state to goal)
-        node = queue.pop(0)
+        node = queue.pop()
 
-        visited.add(node)
+        node_key = node.key()
+        visited[node_key] = node
         
         if node.is_goal():
             break
-        
-        for child in node.children():
+
+        children = []
+        for key, move, cost in node.successors():
         
             # Calculate the cost of this node (total distance from initial state)
-            child_cost = costs[node] + child.backlink.cost
+            child_cost = costs[node_key] + cost
             
             # Record the cost, esp. if it is a cheaper path to this node than previously discovered 
-            if child_cost not in costs or child_cost < costs[child]:
-                costs[child] = child_cost
+            if key not in costs or child_cost < costs[key]:
+                costs[key] = child_cost
+                children.append(node.make_child(key, move, cost))
 
-                # Estimate the total cost of a path to the goal that passes through this node by adding distance from initial state to heuristic distance to goal 
-                priority[child] = child_cost + child.distance()
+        # The children are scored together, so that a state space with a batched heuristic can do it in one call
+        for child, distance in zip(children, distances(children)):
 
-                # Enqueue into priority queue.
-                if child not in queue:
-                    queue.add(child)
+            # Estimate the total cost of a path to the goal that passes through this node by adding distance from initial state to heuristic distance to goal.
+            # Pushing an already queued child just lowers its priority (and keeps the cheaper backlink).
+            queue.push(child, costs[child.key()] + distance)
         
         # Coroutine hack to communicate algorithm state back to viz
-        if (yield node, visited, queue) == -1:
+        if (yield node, visited.values(), queue) == -1:
             return
     
     # Coroutine hack to communicate algorithm state back to viz
-    yield node, visited, queue
-    
\ No newline at end of file
+    yield node, visited.values(), queue
+    
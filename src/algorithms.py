@@ -0,0 +1,38 @@
+import importlib
+
+# The searches that demonstrate.py and batch_autocorrect.py can run, by name
+
+SPACES = [ "grid", "puzzle", "autocorrect" ]
+ANY_SPACE = frozenset(SPACES)
+
+# A search's module is only imported when it is loaded. Each algorithm lists the state spaces it can search, so a mismatch is caught before the search starts.
+ALGORITHMS = {
+    "depthfirst":   ("depth_first_search",   "depth_first_search",   ANY_SPACE),
+    "breadthfirst": ("breadth_first_search", "breadth_first_search", ANY_SPACE),
+    "bestfirst":    ("best_first_search",    "best_first_search",    ANY_SPACE),
+    "astar":        ("a_star_search",        "a_star_search",        ANY_SPACE),
+    "uniformcost":  ("uniform_cost_search",  "uniform_cost_search",  ANY_SPACE),
+    # Walks one board in place, which needs copy(), apply() and undo()
+    "idastar":      ("ida_star_search",      "ida_star_search",      { "puzzle" }),
+    # Search back from the goal node, which autocorrect doesn't have (any English word will do)
+    "bibreadthfirst": ("bidirectional_search", "bidirectional_breadth_first_search", { "grid", "puzzle" }),
+    "biastar":        ("bidirectional_search", "bidirectional_a_star_search",        { "grid", "puzzle" }),
+    # Run on the grid's own arrays
+    "gridastar":        ("grid_search", "grid_a_star_search",        { "grid" }),
+    "griddijkstra":     ("grid_search", "grid_dijkstra_search",      { "grid" }),
+    "gridbreadthfirst": ("grid_search", "grid_breadth_first_search", { "grid" }),
+    "jps":              ("jump_point_search", "jump_point_search",   { "grid" }),
+    # Looks strings up in the lexicon's deletion index rather than searching
+    "symdelete":        ("symmetric_delete", "symmetric_delete_search", { "autocorrect" }),
+}
+
+# Algorithms that also search backwards from the goal, so they need the state space to provide a goal node
+GOAL_DIRECTED = { "bibreadthfirst", "biastar" }
+
+def load_algorithm(algo_choice, space_choice = None):
+    if algo_choice not in ALGORITHMS:
+        raise ValueError("Unknown algorithm: {}".format(algo_choice))
+    module_name, function_name, spaces = ALGORITHMS[algo_choice]
+    if space_choice is not None and space_choice not in spaces:
+        raise ValueError("{} can't search the {} state space (only {})".format(algo_choice, space_choice, ", ".join(sorted(spaces))))
+    return getattr(importlib.import_module(module_name), function_name)
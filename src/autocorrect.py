@@ -1,13 +1,43 @@
+import os
 from collections import namedtuple
-from graphviz import Digraph
-import nltk
-from english import letters, word_set, word_list, smallest_distance_to_any_english_word
-from PIL import Image
-import matplotlib.pyplot as plt
+from trie import Trie
+from memoize import LRUCache
+from english import letters, english_words, english_word_set, english_trie, smallest_distance_to_any_english_word, smallest_distances_to_any_english_word
+
+# Process-wide memos of distance() and is_goal() by the raw string, so that a string reached again by different
+# edits, or in a later query, isn't scored against the lexicon again. COTB_AUTOCORRECT_CACHE_SIZE sets their size.
+CACHE_SIZE     = int(os.environ.get("COTB_AUTOCORRECT_CACHE_SIZE", 200000))
+DISTANCE_CACHE = LRUCache(CACHE_SIZE)
+GOAL_CACHE     = LRUCache(CACHE_SIZE)
+
+def configure_caches(maxsize):
+    DISTANCE_CACHE.resize(maxsize)
+    GOAL_CACHE.resize(maxsize)
+
+def save_caches(directory):
+    os.makedirs(directory, exist_ok = True)
+    fingerprint = english_words().fingerprint()
+    DISTANCE_CACHE.save(os.path.join(directory, "distance.cache"), fingerprint)
+    GOAL_CACHE.save(os.path.join(directory, "goal.cache"), fingerprint)
+
+def load_caches(directory):
+    # Warm caches saved by save_caches, if there are any. Caches saved against another lexicon are ignored.
+    fingerprint = english_words().fingerprint()
+    for cache, name in [ (DISTANCE_CACHE, "distance.cache"), (GOAL_CACHE, "goal.cache") ]:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            cache.load(path, fingerprint)
 
 class String:
 
-    Backlink = namedtuple("Backlink", ["edit_description", "parent", "cost"])
+    class Backlink(namedtuple("Backlink", ["move", "parent", "cost"])):
+
+        # The edit is kept as a tuple, like ("insert", 2, "a"), and only spelled out when a path is shown
+        __slots__ = ()
+
+        @property
+        def edit_description(self):
+            return String.describe(self.move)
 
     def __init__(self, string, graph, backlink = None):
         assert type(string) == str
@@ -19,47 +49,120 @@ class String:
         self._cost = None
         #self.add_to_graphviz()
 
-    def children(self):
+    @staticmethod
+    def describe(move):
+        if move[0] == "insert":
+            return "insert({},{})".format(move[1], move[2])
+        if move[0] == "transpose":
+            return "transpose({},{})".format(move[1], move[1] + 1)
+        return "delete({})".format(move[1])
+
+    @staticmethod
+    def edit(string, move):
+        # The string that a move from successors() turns string into
+        if move[0] == "insert":
+            return string[:move[1]] + move[2] + string[move[1]:]
+        i = move[1]
+        if move[0] == "transpose":
+            return string[:i] + string[i+1] + string[i] + string[i+2:]
+        return string[:i] + string[i+1:]
+
+    def key(self):
+        # What identifies the node, as used by successors()
+        return self.string
 
-        string, parent, children = self.string, self, []
+    def successors(self):
+
+        # (edited string, move, cost) for every edit, without building the child nodes (see make_child).
+        # With an edit budget, only edits that leave some word within the remaining budget.
+        if self.graph.max_edits is None:
+            return self._edits()
+        return self._viable_edits(self.graph.max_edits - self.cost())
+
+    def _viable_edits(self, budget):
+
+        if budget <= 0:
+            return
 
+        # The trie counts edits applied one after another, as this search applies them, so a word within the remaining
+        # budget of a child is within the budget of this string, and only those few need checking. Inserting a letter that a word doesn't contain costs a delete later, so unless some word is near
+        # enough to pay for both, only letters of the nearby words are worth inserting.
+        allowed_transitions = self.graph.allowed_transitions
+        distances = self.graph.trie().words_within(self.string.lower(), budget, allowed_transitions)
+        if not distances:
+            return
+        nearby = Trie(distances)
+        if min(distances.values()) <= budget - 2:
+            useful_letters = letters
+        else:
+            nearby_letters = nearby.letters()
+            useful_letters = [ letter for letter in letters if letter.lower() in nearby_letters ]
+
+        for key, move, cost in self._edits(useful_letters):
+            if nearby.within(key.lower(), budget - cost, allowed_transitions) is not None:
+                yield key, move, cost
+
+    def _edits(self, insert_letters = letters):
+
+        string = self.string
         allowed_transitions = self.graph.allowed_transitions
 
         # Generate Inserts
         if "i" in allowed_transitions:
-            for i in range(len(self.string) + 1):
-                for letter in letters:
-                    edited_string = string[:i] + letter + string[i:]
-                    edit_description = "insert({},{})".format(i,letter)
-                    child = String(edited_string, self.graph, backlink = String.Backlink(edit_description, parent, 1.0) )
-                    children.append(child)
+            for i in range(len(string) + 1):
+                prefix, suffix = string[:i], string[i:]
+                for letter in insert_letters:
+                    yield prefix + letter + suffix, ("insert", i, letter), 1.0
 
         # Generate Transpositions
         if "t" in allowed_transitions:
-            for i in range(len(self.string) - 1):
-                edited_string = string[:i] + string[i+1] + string[i] + string[i+2:]
-                edit_description = "transpose({},{})".format(i, i + 1)
-                child = String(edited_string, self.graph, backlink = String.Backlink(edit_description, parent, 1.0))
-                children.append(child)
+            for i in range(len(string) - 1):
+                yield string[:i] + string[i+1] + string[i] + string[i+2:], ("transpose", i), 1.0
 
         # Generate Deletes
         if "d" in allowed_transitions:
-            for i in range(len(self.string)):
-                edited_string = string[:i] + string[i+1:]
-                edit_description = "delete({})".format(i)
-                child = String(edited_string, self.graph, backlink = String.Backlink(edit_description, parent, 1.0))
-                children.append(child)            
+            for i in range(len(string)):
+                yield string[:i] + string[i+1:], ("delete", i), 1.0
+
+    def make_child(self, string, move, cost):
 
-        return children
+        return String(string, self.graph, backlink = String.Backlink(move, self, cost))
+
+    def children(self):
+        return [ self.make_child(*successor) for successor in self.successors() ]
 
     def is_goal(self):
-        return self.string.lower() in word_set
+        is_goal = GOAL_CACHE.get(self.string)
+        if is_goal is None:
+            if self.graph.max_edits is not None:
+                is_goal = self.string.lower() in self.graph.trie()
+            else:
+                is_goal = self.string.lower() in english_word_set()
+            GOAL_CACHE[self.string] = is_goal
+        return is_goal
 
     def distance(self):
         if self._distance is None:
-            self._distance = smallest_distance_to_any_english_word(self.string)
+            self._distance = DISTANCE_CACHE.get(self.string)
+            if self._distance is None:
+                self._distance = smallest_distance_to_any_english_word(self.string)
+                DISTANCE_CACHE[self.string] = self._distance
         return self._distance
 
+    @staticmethod
+    def batch_distance(nodes):
+        # The informed searches score a node's children through here (see heuristics.py):
+        # whatever the cache doesn't know is looked up in one pass over the lexicon
+        for node in nodes:
+            if node._distance is None:
+                node._distance = DISTANCE_CACHE.get(node.string)
+        unscored  = [ node for node in nodes if node._distance is None ]
+        distances = smallest_distances_to_any_english_word(node.string for node in unscored)
+        for node, distance in zip(unscored, distances):
+            node._distance = distance
+            DISTANCE_CACHE[node.string] = distance
+        return [ node._distance for node in nodes ]
+
     def is_root(self):
         return self.backlink is None
 
@@ -68,8 +171,8 @@ class String:
             cost = 0
             x = self
             while x.backlink is not None:
-                x = x.backlink.parent
                 cost += x.backlink.cost
+                x = x.backlink.parent
             self._cost = cost
         return self._cost           
 
@@ -98,11 +201,13 @@ class String:
 
 class StringGraph:
 
-    def __init__(self, string, allowed_transitions = None):
-        self.graphviz = Digraph(format="png")
-        self.graphviz.graph_attr.update(rank='min')
+    def __init__(self, string, allowed_transitions = None, max_edits = None):
+
+        # With max_edits, successors that can't reach a word within the remaining edits are pruned, using a trie over the lexicon
+        self.graphviz = None
         self.initial_state = String(string, self)
         self.allowed_transitions = allowed_transitions or "idt"
+        self.max_edits = max_edits
         self.rendered_edges = set()
         self.rendered_nodes = set()
         self._fig = None
@@ -112,8 +217,18 @@ class StringGraph:
     def start_node(self):
         return self.initial_state
 
+    def trie(self):
+        return english_trie()
+
     def init_viz(self):
 
+        # Imported here so that headless solves never pay for graphviz or matplotlib
+        from graphviz import Digraph
+        import matplotlib.pyplot as plt
+
+        self.graphviz = Digraph(format="png")
+        self.graphviz.graph_attr.update(rank='min')
+
         fig = plt.figure()
         img_plot = plt.subplot(111)
 
@@ -130,6 +245,9 @@ class StringGraph:
         if self.graphviz is None:
             return
 
+        from PIL import Image
+        import matplotlib.pyplot as plt
+
         g = self.graphviz
         
         # For the parts of the graph that have been visited
@@ -0,0 +1,87 @@
+import sys, time
+from collections import namedtuple
+from multiprocessing import Pool
+
+# Autocorrects many strings at once: each distinct string is solved once on a pool of workers that load the lexicon
+# at startup, results come back in input order, and timeouts are checked between search steps.
+
+# edits are the edit descriptions from the original string to the correction, which is None if nothing was found in time
+Correction = namedtuple("Correction", [ "string", "correction", "edits", "timed_out" ])
+
+_options = None
+
+
+def _init_worker(options):
+
+    global _options
+    _options = options
+
+    # Everything the searches look words up in is loaded (or mapped) up front, once per worker
+    from english import english_words, english_word_set, english_lexicon, english_trie
+    english_words()
+    english_lexicon()
+    if options["max_edits"] is not None:
+        english_trie()
+    else:
+        english_word_set()
+    if options["algorithm"] == "symdelete":
+        from symmetric_delete import symmetric_delete_index
+        symmetric_delete_index()
+
+
+def correct(string, algorithm = "astar", allowed_transitions = None, max_edits = None, timeout = None):
+
+    # Solves one string in this process
+    from autocorrect import StringGraph
+    from algorithms import load_algorithm
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    search = load_algorithm(algorithm, "autocorrect")(StringGraph(string, allowed_transitions, max_edits = max_edits).start_node())
+    next(search)
+
+    for node, visited, queue in search:
+        if node.is_goal():
+            edits = [ step.backlink.edit_description for step in reversed(node.path()[:-1]) ]
+            return Correction(string, node.string, edits, False)
+        if deadline is not None and time.monotonic() > deadline:
+            search.close()
+            return Correction(string, None, None, True)
+
+    return Correction(string, None, None, False)
+
+
+def _correct_in_worker(string):
+    return correct(string, _options["algorithm"], _options["allowed_transitions"], _options["max_edits"], _options["timeout"])
+
+
+def autocorrect_batch(strings, algorithm = "astar", allowed_transitions = None, max_edits = None, timeout = None, processes = None, chunksize = 1):
+
+    # Yields a Correction for every input string, in input order
+    from algorithms import load_algorithm
+    load_algorithm(algorithm, "autocorrect")
+
+    strings = list(strings)
+    distinct = list(dict.fromkeys(strings))
+
+    options = { "algorithm": algorithm, "allowed_transitions": allowed_transitions, "max_edits": max_edits, "timeout": timeout }
+
+    with Pool(processes, initializer = _init_worker, initargs = (options,)) as pool:
+
+        # imap hands results back in submission order, which is the order of first appearance in the input
+        results = pool.imap(_correct_in_worker, distinct, chunksize)
+        done = {}
+
+        for string in strings:
+            while string not in done:
+                result = next(results)
+                done[result.string] = result
+            yield done[string]
+
+
+if __name__ == "__main__":
+
+    # Corrects whitespace separated words from stdin, one per line of output
+    words = sys.stdin.read().split()
+    for result in autocorrect_batch(words, max_edits = 2, timeout = 10):
+        print(result.string, result.correction if result.correction is not None else "?", " ".join(result.edits or []))
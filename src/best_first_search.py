@@ -1,5 +1,5 @@
-from collections import deque
-from sortedcontainers import SortedList
+from priority_queue import PriorityQueue
+from heuristics import distances
 
 
 def best_first_search(start):
@@ -7,28 +7,37 @@ def best_first_search(start):
     if (yield) == -1:
         return
 
-    visited = set()
-    queue   = SortedList([start], key = lambda x: x.distance())
+    # Duplicate checks go by node.key(): seen holds everything visited or queued, and a child node is only built for a new key
+    visited = {}
+    seen    = { start.key() }
+
+    # The heuristic is evaluated once per child, when it is queued
+    queue   = PriorityQueue()
+    queue.push(start, start.distance())
     
     while len(queue) > 0:
 
-        node = queue.pop(0)
-        
-        if node in visited:
-            continue
+        node = queue.pop()
         
         if node.is_goal():
             break
 
-        visited.add(node)
-        
-        for child in node.children():
-            queue.add(child)
+        visited[node.key()] = node
+
+        children = []
+        for key, move, cost in node.successors():
+            if key not in seen:
+                seen.add(key)
+                children.append(node.make_child(key, move, cost))
+
+        # Built first and scored after, so that state spaces can score a node's children together
+        for child, distance in zip(children, distances(children)):
+            queue.push(child, distance)
         
         # Coroutine hack to communicate algorithm state back to viz
-        if (yield node, visited, queue) == -1:
+        if (yield node, visited.values(), queue) == -1:
             return
     
     # Coroutine hack to communicate algorithm state back to viz
-    yield node, visited, queue
-    
\ No newline at end of file
+    yield node, visited.values(), queue
+    
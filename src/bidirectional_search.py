@@ -0,0 +1,145 @@
+from itertools import chain
+from priority_queue import PriorityQueue
+
+# Searches that grow a tree forwards from the start and one backwards (with predecessors()) from the goal until they
+# meet. The backward half is then replayed forwards, so the goal node yielded has an ordinary path() to the start.
+
+
+def bidirectional_breadth_first_search(start, goal):
+
+    if (yield) == -1:
+        return
+
+    if start == goal:
+        yield start, set(), []
+        return
+
+    # node -> (depth, node), one map per direction
+    forward  = { start: (0, start) }
+    backward = { goal:  (0, goal) }
+    forward_layer, backward_layer = [ start ], [ goal ]
+
+    meeting = None
+
+    while forward_layer and backward_layer and meeting is None:
+
+        # Expand a whole layer of the smaller frontier
+        is_forward = len(forward_layer) <= len(backward_layer)
+        layer, seen, other = (forward_layer, forward, backward) if is_forward else (backward_layer, backward, forward)
+
+        next_layer = []
+        best = None
+
+        for node in layer:
+
+            depth = seen[node][0]
+
+            for child in (node.children() if is_forward else node.predecessors()):
+
+                if child in seen:
+                    continue
+
+                seen[child] = (depth + 1, child)
+                next_layer.append(child)
+
+                # The first layer that touches the other tree holds the shortest connection, but not
+                # necessarily at the first contact, so finish the layer and keep the best
+                if child in other:
+                    total = depth + 1 + other[child][0]
+                    if best is None or total < best[0]:
+                        best = (total, child)
+
+            # Coroutine hack to communicate algorithm state back to viz.
+            # Callers stop at the first goal they see, so the root of the backward tree is never reported as the current node.
+            current = start if node is goal else node
+            if (yield current, chain(forward, backward), chain(forward_layer, backward_layer)) == -1:
+                return
+
+        if is_forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+        if best is not None:
+            meeting = best[1]
+
+    if meeting is None:
+        return
+
+    node = _join(forward[meeting][1], backward[meeting][1])
+
+    # Coroutine hack to communicate algorithm state back to viz
+    yield node, chain(forward, backward), chain(forward_layer, backward_layer)
+
+
+def bidirectional_a_star_search(start, goal):
+
+    # Front-to-end bidirectional A*: the forward search is guided by node.distance() (to the goal) and the
+    # backward search by node.distance_to(start). Every path that could still beat the best connection
+    # found so far (mu) must pass through both open lists with f below mu, so the search stops as soon as
+    # either list's smallest f reaches mu. That only needs the heuristics to be admissible.
+
+    if (yield) == -1:
+        return
+
+    # node -> (cost from the root of its tree, node)
+    forward  = { start: (0, start) }
+    backward = { goal:  (0, goal) }
+
+    forward_queue, backward_queue = PriorityQueue(), PriorityQueue()
+    forward_queue.push(start, start.distance())
+    backward_queue.push(goal, goal.distance_to(start))
+
+    visited = set()
+
+    mu, meeting = float("inf"), None
+    if start == goal:
+        mu, meeting = 0, start
+
+    while len(forward_queue) > 0 and len(backward_queue) > 0:
+
+        if forward_queue.peek_priority() >= mu or backward_queue.peek_priority() >= mu:
+            break
+
+        # Expand the direction with the smaller open list
+        is_forward = len(forward_queue) <= len(backward_queue)
+        queue, seen, other = (forward_queue, forward, backward) if is_forward else (backward_queue, backward, forward)
+
+        node = queue.pop()
+        visited.add(node)
+        cost = seen[node][0]
+
+        for child in (node.children() if is_forward else node.predecessors()):
+
+            child_cost = cost + child.backlink.cost
+
+            if child not in seen or child_cost < seen[child][0]:
+                seen[child] = (child_cost, child)
+                queue.push(child, child_cost + (child.distance() if is_forward else child.distance_to(start)))
+
+                if child in other and child_cost + other[child][0] < mu:
+                    mu, meeting = child_cost + other[child][0], child
+
+        # Coroutine hack to communicate algorithm state back to viz.
+        # Callers stop at the first goal they see, so the root of the backward tree is never reported as the current node.
+        current = start if node is goal else node
+        if (yield current, visited, chain(forward_queue, backward_queue)) == -1:
+            return
+
+    if meeting is None:
+        return
+
+    node = _join(forward[meeting][1], backward[meeting][1])
+
+    # Coroutine hack to communicate algorithm state back to viz
+    yield node, visited, chain(forward_queue, backward_queue)
+
+
+def _join(forward_node, backward_node):
+
+    # Walk the backward tree from the meeting point to the goal, taking the matching child of the forward path each step
+    node = forward_node
+    while backward_node.backlink is not None:
+        backward_node = backward_node.backlink.parent
+        node = next(child for child in node.children() if child == backward_node)
+    return node
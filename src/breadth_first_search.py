@@ -4,28 +4,29 @@ def breadth_first_search(start):
 
     if (yield) == -1:
         return
-    
-    visited = set()
+
+    # Duplicate checks go by node.key(), so a child node is only built for a successor that hasn't been seen before
+    visited = {}
+    seen    = { start.key() }
     queue   = deque([ start ])
 
     while len(queue) > 0:
 
         node = queue.popleft()
 
-        if node in visited:
-            continue
-        
         if node.is_goal():
             break
-        
-        for child in node.children():
-            if child not in visited:
-                visited.add(node)
-                queue.append(child)
+
+        visited[node.key()] = node
+
+        for key, move, cost in node.successors():
+            if key not in seen:
+                seen.add(key)
+                queue.append(node.make_child(key, move, cost))
         
         # Coroutine hack to communicate algorithm state back to viz
-        if (yield node, visited, queue) == -1:
+        if (yield node, visited.values(), queue) == -1:
             return
     
     # Coroutine hack to communicate algorithm state back to viz
-    yield node, visited, queue
\ No newline at end of file
+    yield node, visited.values(), queue
@@ -0,0 +1,130 @@
+import math
+import numpy as np
+from grid import DIRECTIONS
+from grid_search import cell_index, cell_position, node_chain, octile_distance
+from priority_queue import PriorityQueue
+
+# D* Lite (Koenig & Likhachev, 2002) for Grid: searches back from the goal and keeps g and rhs per cell, so after
+# an obstacle change the next plan() only repairs the cells the change made inconsistent.
+
+
+class DStarLite:
+
+    def __init__(self, grid, start = None, goal = None):
+
+        self._grid  = grid
+        self._width = grid._X + 2
+        size = (grid._Y + 2) * self._width
+
+        self._start = cell_index(grid._start if start is None else start, self._width)
+        self._goal  = cell_index(grid._goal if goal is None else goal, self._width)
+
+        self._moves = [ (dy * self._width + dx, cost) for (direction, dy, dx), cost in zip(DIRECTIONS, grid.step_costs()) ]
+        self._straight, self._diagonal = grid.octile_costs()
+
+        self._g   = np.full(size, math.inf)
+        self._rhs = np.full(size, math.inf)
+        self._rhs[self._goal] = 0.0
+
+        # Heuristic values stay valid as the start moves by adding the distance moved to every key (km)
+        self._km = 0.0
+        self._queue = PriorityQueue()
+        self._queue.push(self._goal, self._key(self._goal))
+
+        self.expansions = 0
+
+        grid.add_listener(self._cells_changed)
+
+    def close(self):
+        # Stops listening to the grid
+        self._grid.remove_listener(self._cells_changed)
+
+    def move_to(self, start):
+        start = cell_index(start, self._width)
+        self._km += self._heuristic(self._start, start)
+        self._start = start
+
+    def plan(self):
+
+        # Returns the goal GridNode, with the usual path() back to the start, or None if the goal can't be reached
+        self._compute_shortest_path()
+
+        index = self._start
+        if self._g[index] == math.inf:
+            return None
+
+        # Follow the cheapest neighbors down to the goal
+        positions = [ cell_position(index, self._width) ]
+        while index != self._goal:
+            index = min(self._neighbors(index), key = lambda neighbor: neighbor[1] + self._g[neighbor[0]])[0]
+            positions.append(cell_position(index, self._width))
+
+        return node_chain(self._grid, positions)
+
+    def _heuristic(self, a, b):
+        (y, x), (to_y, to_x) = cell_position(a, self._width), cell_position(b, self._width)
+        return octile_distance(y - to_y, x - to_x, self._straight, self._diagonal)
+
+    def _key(self, index):
+        m = min(self._g[index], self._rhs[index])
+        return (m + self._heuristic(self._start, index) + self._km, m)
+
+    def _neighbors(self, index):
+        # Moves in and out of a cell cost the same, so these are its successors and its predecessors
+        passable = self._grid._passable.ravel()
+        if not passable[index]:
+            return []
+        terrain = self._grid._terrain
+        if terrain is None:
+            return [ (index + offset, cost) for offset, cost in self._moves if passable[index + offset] ]
+        terrain = terrain.ravel()
+        return [ (index + offset, cost * 0.5 * float(terrain[index] + terrain[index + offset])) for offset, cost in self._moves if passable[index + offset] ]
+
+    def _update(self, index):
+
+        if index != self._goal:
+            neighbors = self._neighbors(index)
+            self._rhs[index] = min((cost + self._g[neighbor] for neighbor, cost in neighbors), default = math.inf)
+
+        if index in self._queue:
+            self._queue.remove(index)
+        if self._g[index] != self._rhs[index]:
+            self._queue.push(index, self._key(index))
+
+    def _compute_shortest_path(self):
+
+        queue, g, rhs = self._queue, self._g, self._rhs
+
+        while len(queue) > 0 and (queue.peek_priority() < self._key(self._start) or rhs[self._start] != g[self._start]):
+
+            old_key = queue.peek_priority()
+            index = queue.pop()
+            new_key = self._key(index)
+            self.expansions += 1
+
+            if old_key < new_key:
+                # Queued before the start moved
+                queue.push(index, new_key)
+            elif g[index] > rhs[index]:
+                # Overconsistent: settle on the cheaper cost and tell the neighbors
+                g[index] = rhs[index]
+                for neighbor, cost in self._neighbors(index):
+                    self._update(neighbor)
+            else:
+                # Underconsistent: its path got more expensive, so re-derive it and its neighbors
+                g[index] = math.inf
+                for neighbor, cost in self._neighbors(index):
+                    self._update(neighbor)
+                self._update(index)
+
+    def _cells_changed(self, grid, cells):
+
+        # A cell that became blocked loses its edges and one that became free gains some, which changes
+        # the rhs of the cell and of every neighbor around it
+        passable = grid._passable.ravel()
+        for pos in cells:
+            index = cell_index(pos, self._width)
+            self._update(index)
+            for offset, cost in self._moves:
+                if passable[index + offset]:
+                    self._update(index + offset)
@@ -1,64 +1,104 @@
-import sys, time
-from numpy.random         import random
-from grid                 import *
-from puzzle               import *
-from autocorrect          import *
-from depth_first_search   import depth_first_search
-from breadth_first_search import breadth_first_search
-from best_first_search    import best_first_search
-from a_star_search        import a_star_search
-
-algo_choice  = sys.argv[1]
-space_choice = sys.argv[2]
-
-if algo_choice == "bestfirst":
-    obstacles = [(5,15,33,35), (5,7,20,35), (13,15,20,35)]
-else:
-    obstacles = [(10,20,15,25), (5,15,30,35)]
-
-if space_choice == "grid":
-    graph = Grid((25,50), obstacles = obstacles, start = (12,12), goal = (12,37))
-elif space_choice == "puzzle":
-    graph = PuzzleGraph(3)
-elif space_choice == "autocorrect":
-    canonical_string = "brithdya"
-    graph = StringGraph(canonical_string, allowed_transitions = "td")
-
-start = graph.start_node()
-
-if algo_choice == "depthfirst":
-    algorithm = depth_first_search(start)
-elif algo_choice == "breadthfirst":
-    algorithm = breadth_first_search(start)
-elif algo_choice == "bestfirst":
-    algorithm = best_first_search(start)
-elif algo_choice == "astar":
-    algorithm = a_star_search(start)
-
-next(algorithm)
-
-if space_choice == "grid" or space_choice == "autocorrect":
-    def handle_close(evt):
+import sys
+from algorithms import ALGORITHMS, GOAL_DIRECTED, SPACES, load_algorithm
+
+# Plotting / rendering libraries are only imported by the state spaces once visualization is requested.
+
+def make_graph(space_choice, algo_choice, **options):
+
+    # The demo instance of each space; options replace any of its parameters (see below)
+    if algo_choice == "bestfirst":
+        obstacles = [(5,15,33,35), (5,7,20,35), (13,15,20,35)]
+    else:
+        obstacles = [(10,20,15,25), (5,15,30,35)]
+
+    if space_choice == "grid":
+        from grid import Grid
+        parameters = { "size": (25,50), "obstacles": obstacles, "start": (12,12), "goal": (12,37) }
+        parameters.update(options)
+        return Grid(**parameters)
+    elif space_choice == "puzzle":
+        from puzzle import PuzzleGraph
+        parameters = { "side_length": 3 }
+        parameters.update(options)
+        return PuzzleGraph(**parameters)
+    elif space_choice == "autocorrect":
+        from autocorrect import StringGraph
+        parameters = { "string": "brithdya", "allowed_transitions": "td" }
+        parameters.update(options)
+        return StringGraph(**parameters)
+
+    raise ValueError("Unknown state space: {}".format(space_choice))
+
+def run(graph, algorithm, visualize = False, goal_directed = False):
+
+    # Drives the algorithm coroutine to completion and returns the goal node (or None if the space was exhausted)
+
+    if goal_directed:
+        algorithm = algorithm(graph.start_node(), graph.goal_node())
+    else:
+        algorithm = algorithm(graph.start_node())
+    next(algorithm)
+
+    if visualize:
+        def handle_close(evt):
+            try:
+                algorithm.send(-1)
+            except StopIteration:
+                pass
+        fig = graph.init_viz()
+        if fig is not None:
+            fig.canvas.mpl_connect('close_event', handle_close)
+
+    while True:
         try:
-            algorithm.send(-1)
+            current, visited, queued = algorithm.send(0)
+            if visualize:
+                graph.redraw(queued, visited, current, current.path(), None)
+            if current.is_goal():
+                return current
         except StopIteration:
-            pass
-    fig = graph.init_viz()
-    fig.canvas.mpl_connect('close_event', handle_close)
+            return None
+
+def solve(space_choice, algo_choice, visualize = False, graph = None, **options):
+
+    # Solves graph if one is given, and otherwise the space's demo instance with options in place of its parameters,
+    # e.g. solve("autocorrect", "astar", string = "teh") or solve("grid", "jps", start = (0, 0), goal = (24, 49)).
+    # The algorithm is checked against the space before the space is built.
+    algorithm = load_algorithm(algo_choice, space_choice)
+    if graph is None:
+        graph = make_graph(space_choice, algo_choice, **options)
+    return run(graph, algorithm, visualize = visualize, goal_directed = algo_choice in GOAL_DIRECTED)
+
+def main(argv):
+
+    headless = "--headless" in argv
+    args = [ arg for arg in argv if arg != "--headless" ]
 
+    if len(args) != 2:
+        print("Usage: python demonstrate.py <{}> <{}> [--headless]".format("|".join(ALGORITHMS), "|".join(SPACES)))
+        return 2
+
+    algo_choice, space_choice = args
 
-i = 0
-while True:
     try:
-        current, visited, queued = algorithm.send(0)
-        i+=1
-        graph.redraw(queued, visited, current, current.path(), None)
-        if current.is_goal():
-            print("Goal!!!!")
-            break
-    except StopIteration:
+        goal = solve(space_choice, algo_choice, visualize = not headless)
+    except ValueError as error:
+        print(error)
+        return 2
+
+    if goal is None:
         print("Finished.")
-        break
+    else:
+        print("Goal!!!!")
+
+    if headless:
+        if goal is not None:
+            for node in reversed(goal.path()):
+                print(node.pos() if hasattr(node, "pos") else node)
+    else:
+        input("Press [ENTER] to close.")
+
+    return 0
 
-input("Press [ENTER] to close.")
-    
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
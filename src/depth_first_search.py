@@ -5,7 +5,8 @@ def depth_first_search(start):
     if (yield) == -1:
         return
 
-    visited = set()
+    # Duplicate checks go by node.key(), so a child node is only built for a successor that hasn't been visited
+    visited = {}
     queue   = deque([ start ])
 
     while len(queue) > 0:
@@ -15,15 +16,15 @@ def depth_first_search(start):
         if node.is_goal():
             break
 
-        visited.add(node)
+        visited[node.key()] = node
         
-        for child in node.children():
-            if child not in visited:
-                queue.append(child)
+        for key, move, cost in node.successors():
+            if key not in visited:
+                queue.append(node.make_child(key, move, cost))
         
         # Coroutine hack to communicate algorithm state back to viz
-        if (yield node, visited, queue) == -1:
+        if (yield node, visited.values(), queue) == -1:
             return
     
     # Coroutine hack to communicate algorithm state back to viz
-    yield node, visited, queue
\ No newline at end of file
+    yield node, visited.values(), queue
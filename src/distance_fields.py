@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from grid_search import distance_field, node_chain
+
+# Reverse distance fields (one Dijkstra from the goal over the whole map) for the most recently used goals, so a query
+# just steps downhill from the start. Dropped whenever the grid's obstacles change.
+
+
+class DistanceFieldCache:
+
+    def __init__(self, grid, maxsize = 4):
+        self._grid = grid
+        self._maxsize = maxsize
+        self._fields = OrderedDict()
+        self._version = grid._version
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, goal):
+        return self._version == self._grid._version and tuple(goal) in self._fields
+
+    def invalidate(self, goal = None):
+        # Forget one goal's field, or every field
+        if goal is None:
+            self._fields.clear()
+        else:
+            self._fields.pop(tuple(goal), None)
+
+    def field(self, goal = None):
+
+        goal = tuple(self._grid._goal if goal is None else goal)
+
+        # Any change to the map makes every field stale
+        if self._version != self._grid._version:
+            self._fields.clear()
+            self._version = self._grid._version
+
+        if goal in self._fields:
+            self.hits += 1
+            self._fields.move_to_end(goal)
+            return self._fields[goal]
+
+        self.misses += 1
+        field = distance_field(self._grid, goal)
+        self._fields[goal] = field
+        if len(self._fields) > self._maxsize:
+            self._fields.popitem(last = False)
+        return field
+
+    def path(self, start = None, goal = None):
+
+        # Returns the goal GridNode, with the usual path() back to the start, or None if the goal can't be reached
+        grid = self._grid
+        start = grid._start if start is None else start
+        field = self.field(goal)
+
+        y, x = start
+        if not grid._has_position((y, x)) or field[y, x] == float("inf"):
+            return None
+
+        positions = [ (y, x) ]
+        while field[y, x] > 0:
+            remaining, y, x = min((field[y + dy, x + dx] + grid.move_cost((y, x), (y + dy, x + dx)), y + dy, x + dx) for direction, dy, dx in grid.neighbor_offsets((y, x)))
+            positions.append((y, x))
+
+        return node_chain(grid, positions)
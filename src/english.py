@@ -1,20 +1,65 @@
-
-import nltk
-from nltk.corpus import brown as words
+import os, sys
+import numpy as np
+from collections import defaultdict
 from distance import hamming
+from trie import Trie
+from lexicon import CompiledLexicon, write_lexicon
 
 letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
-try:
-    word_list = words.words()
-except LookupError:
-    nltk.download("brown")  # The standard English corpus includes a lot of things I don't consider words, so I use the brown corpus instead.
-    word_list = words.words()
+# The filtered word list is compiled once into a binary file and memory-mapped on first use,
+# so importing this module never touches nltk. Run `python english.py` to (re)build it.
+LEXICON_PATH = os.environ.get("COTB_LEXICON", os.path.join(os.path.dirname(os.path.abspath(__file__)), "english.lexicon"))
+
+def load_corpus_words():
+
+    import nltk
+    from nltk.corpus import brown as words
+
+    try:
+        word_list = words.words()
+    except LookupError:
+        nltk.download("brown")  # The standard English corpus includes a lot of things I don't consider words, so I use the brown corpus instead.
+        word_list = words.words()
+
+    word_set = set(map(str.lower, word_list))
+
+    word_set  = word_set - set(["b", "c", "d", "e", "f", "g", "h", "j", "k", "l", "m", "n", "o", "p", "q", "r", "s", "t", "u", "v", "w", "x", "y", "z"])
+    return word_set
+
+def build_english_lexicon(path = LEXICON_PATH):
+    write_lexicon(load_corpus_words(), path)
+
+_words = None
+_word_list = None
+
+def english_words():
+    global _words
+    if _words is None:
+        if not os.path.exists(LEXICON_PATH):
+            build_english_lexicon(LEXICON_PATH)
+        _words = CompiledLexicon(LEXICON_PATH)
+    return _words
+
+_word_set = None
 
-word_set = set(map(str.lower, word_list))
+def english_word_set():
+    # A real set for the membership tests on every goal check, which the compiled lexicon can only answer with a bisect
+    global _word_set
+    if _word_set is None:
+        _word_set = frozenset(english_words())
+    return _word_set
 
-word_set  = word_set - set(["b", "c", "d", "e", "f", "g", "h", "j", "k", "l", "m", "n", "o", "p", "q", "r", "s", "t", "u", "v", "w", "x", "y", "z"])
-word_list = list(word_set)
+# word_set and word_list are still importable, but are only loaded when first accessed
+def __getattr__(name):
+    global _word_list
+    if name == "word_set":
+        return english_word_set()
+    if name == "word_list":
+        if _word_list is None:
+            _word_list = list(english_words())
+        return _word_list
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 def string_distance(a, b):
     dif_len = abs(len(a) - len(b))
@@ -23,5 +68,122 @@ def string_distance(a, b):
     truncated_b = b[:min_len]
     return hamming(truncated_a, truncated_b) + dif_len
 
+# A trie over the lexicon, for searches that need to know whether a string can still reach a word within a few edits.
+# Built on first use, so that importing this module stays cheap.
+_word_trie = None
+
+def english_trie():
+    global _word_trie
+    if _word_trie is None:
+        _word_trie = Trie(english_words())
+    return _word_trie
+
+class LengthBucketedLexicon:
+
+    # Upper bound on the size of the (queries x words x characters) comparison block
+    BLOCK_SIZE = 1 << 22
+
+    def __init__(self, words = (), buckets = None):
+
+        # One fixed width uint8 matrix per word length, so string_distance against a whole bucket is a single comparison
+        if buckets is None:
+            by_length = defaultdict(list)
+            for word in words:
+                by_length[len(word)].append(word)
+            buckets = { length: LengthBucketedLexicon.encode(bucket, length) for length, bucket in by_length.items() }
+
+        self.buckets = buckets
+        self.lengths = np.asarray(sorted(self.buckets), dtype = np.int64)
+
+    @staticmethod
+    def encode(strings, length):
+        encoded = "".join(strings).encode("latin-1", errors = "replace")
+        return np.frombuffer(encoded, dtype = np.uint8).reshape((len(strings), length))
+
+    def smallest_distance(self, string):
+        return self.smallest_distances([string])[0]
+
+    def smallest_distances(self, strings):
+
+        strings = list(strings)
+        results = [None] * len(strings)
+
+        # Queries of the same length share the same |len diff| to every bucket, so score them together
+        by_length = defaultdict(list)
+        for i, string in enumerate(strings):
+            by_length[len(string)].append(i)
+
+        for length, indices in by_length.items():
+            queries = LengthBucketedLexicon.encode([ strings[i] for i in indices ], length)
+            best = self._smallest_distances_of_length(queries, length)
+            for i, distance in zip(indices, best.tolist()):
+                results[i] = distance
+
+        return results
+
+    def within(self, string, k):
+
+        # (distance, word) for every word at most k away, nearest first. Only buckets within k of the string's length can qualify.
+        query   = LengthBucketedLexicon.encode([ string ], len(string))[0]
+        results = []
+        for bucket_length in self.lengths.tolist():
+            dif_len = abs(bucket_length - len(string))
+            if dif_len > k:
+                continue
+            min_len = min(len(string), bucket_length)
+            bucket  = self.buckets[bucket_length]
+            distances = (bucket[:, :min_len] != query[None, :min_len]).sum(axis = 1) + dif_len
+            for i in np.flatnonzero(distances <= k).tolist():
+                results.append((int(distances[i]), bucket[i].tobytes().decode("latin-1")))
+        results.sort(key = lambda x: x[0])
+        return results
+
+    def _smallest_distances_of_length(self, queries, length):
+
+        best = np.full(len(queries), np.iinfo(np.int64).max, dtype = np.int64)
+
+        # Visit buckets nearest in length first. Every word in a bucket is at least |len diff| away,
+        # so once that bound reaches the worst of the current best distances nothing further can improve on them.
+        order = np.argsort(np.abs(self.lengths - length), kind = "stable")
+
+        for bucket_length in self.lengths[order].tolist():
+
+            dif_len = abs(bucket_length - length)
+            active = np.flatnonzero(best > dif_len)
+            if len(active) == 0:
+                break
+
+            min_len = min(length, bucket_length)
+            bucket  = self.buckets[bucket_length][:, :min_len]
+            truncated_queries = queries[active, :min_len]
+
+            rows = max(1, LengthBucketedLexicon.BLOCK_SIZE // max(1, len(active) * min_len))
+            for start in range(0, len(bucket), rows):
+                block = bucket[start:start + rows]
+                mismatches = (truncated_queries[:, None, :] != block[None, :, :]).sum(axis = 2)
+                best[active] = np.minimum(best[active], mismatches.min(axis = 1) + dif_len)
+
+        return best
+
+_lexicon = None
+
+def english_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        # The compiled lexicon is already grouped by length, so its buckets are used in place
+        _lexicon = LengthBucketedLexicon(buckets = english_words().buckets)
+    return _lexicon
+
 def smallest_distance_to_any_english_word(string):
-    return min(string_distance(string, word) for word in word_list)
\ No newline at end of file
+    return english_lexicon().smallest_distance(string)
+
+def smallest_distances_to_any_english_word(strings):
+    return english_lexicon().smallest_distances(strings)
+
+def english_words_within(string, k):
+    return english_lexicon().within(string, k)
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else LEXICON_PATH
+    build_english_lexicon(path)
+    print("Wrote", len(CompiledLexicon(path)), "words to", path)
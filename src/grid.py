@@ -1,10 +1,29 @@
 import math
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
 from instrumentation import INSTANCE_COUNT
 from collections import namedtuple
 
+# 8-Neighbors, starting at 12 o clock and then clockwise. Bit i of a cell's neighbor mask is set when DIRECTIONS[i] leads somewhere passable.
+DIRECTIONS = [ ("T", -1, 0), ("TR", -1, 1), ("R", 0, 1), ("BR", 1, 1), ("B", 1, 0), ("BL", 1, -1), ("L", 0, -1), ("TL", -1, -1) ]
+
+# The valid (direction, dy, dx) offsets for each of the 256 possible neighbor masks
+NEIGHBOR_TABLE = [ [ direction for i, direction in enumerate(DIRECTIONS) if mask & (1 << i) ] for mask in range(256) ]
+
+def neighbor_masks(passable):
+
+    # Every cell's passable neighbors packed into a byte, from the padded passability mask
+    height, width = passable.shape[0] - 2, passable.shape[1] - 2
+    masks = np.zeros((height, width), dtype = np.uint8)
+    for i, (direction, dy, dx) in enumerate(DIRECTIONS):
+        masks |= passable[1 + dy:1 + dy + height, 1 + dx:1 + dx + width].astype(np.uint8) << i
+    return masks
+
+def octile_distance(dy, dx, straight = 1.0, diagonal = 1.0):
+    # Length of the shortest 8-connected path on an empty grid
+    dy, dx = abs(dy), abs(dx)
+    diagonal = min(diagonal, 2.0 * straight)
+    return diagonal * min(dy, dx) + straight * abs(dy - dx)
+
 class GridNode:
 
     Backlink = namedtuple("Backlink", ["direction", "parent", "cost"])
@@ -13,28 +32,32 @@ class GridNode:
         self._grid = grid
         self._y, self._x = start
         self.backlink = backlink
-        self._cost = None
+        self._cost = 0.0 if backlink is None else backlink.parent._cost + backlink.cost
         INSTANCE_COUNT[0] += 1
 
     def __del__(self):
         INSTANCE_COUNT[0] -= 1
 
     def children(self):
+        y, x = self._y, self._x
+        return [ self._make_node((y + dy, x + dx), direction) for direction, dy, dx in self._grid.neighbor_offsets((y, x)) ]
+
+    def key(self):
+        # What identifies the node, as used by successors()
+        return self._y, self._x
+
+    def successors(self):
+        # (key, move, cost) for every move, without building the child nodes (see make_child)
+        y, x = self._y, self._x
+        for direction, dy, dx in self._grid.neighbor_offsets((y, x)):
+            yield (y + dy, x + dx), direction, self._grid.move_cost((y, x), (y + dy, x + dx))
 
-        # 4-Neighbors, starting at 12 o clock and then clockwise
-        
-        children = {
-            "T":  (self._y - 1, self._x + 0),
-            "TR": (self._y - 1, self._x + 1),
-            "R":  (self._y + 0, self._x + 1),
-            "BR": (self._y + 1, self._x + 1),
-            "B":  (self._y + 1, self._x + 0),
-            "BL": (self._y + 1, self._x - 1),
-            "L":  (self._y + 0, self._x - 1),
-            "TL": (self._y - 1, self._x - 1),
-        }
-
-        return [ self._make_node(child, direction) for direction, child in children.items() if self._grid._has_position(child) ]
+    def make_child(self, pos, direction, cost):
+        return GridNode(self._grid, pos, GridNode.Backlink(direction = direction, parent = self, cost = cost))
+
+    def predecessors(self):
+        # Every move can be reversed at the same cost
+        return self.children()
 
     def pos(self):
         return self._y, self._x
@@ -46,19 +69,13 @@ class GridNode:
         return False
 
     def distance(self):
-        goal_y, goal_x = self._grid._goal
-        return (self._y - goal_y) ** 2.0 + (self._x - goal_x) ** 2.0
+        return self._grid.estimate((self._y, self._x), self._grid._goal)
+
+    def distance_to(self, other):
+        return self._grid.estimate((self._y, self._x), (other._y, other._x))
 
     def cost(self):
-        if self._cost is None:
-            cost = 0
-            x = self
-            while True:
-                cost += 1
-                if x.backlink is None:
-                    break
-                x = x.backlink.parent
-            self._cost = cost
+        # Sum of the move costs from the root, carried over from the parent when the node is made
         return self._cost
 
     def path(self):
@@ -82,7 +99,7 @@ class GridNode:
         return hash((self._y, self._x))
 
     def _make_node(self, pos, direction):
-        backlink = GridNode.Backlink(direction = direction, parent= self, cost = 1.0)
+        backlink = GridNode.Backlink(direction = direction, parent= self, cost = self._grid.move_cost((self._y, self._x), pos))
         return GridNode(self._grid, pos, backlink)
 
 class Grid:
@@ -97,27 +114,74 @@ class Grid:
     START   = 7
     PATH    = 8
 
-    def __init__(self, size, obstacles, start, goal):
+    # What GridNode.distance() estimates with: squared straight line distance (not a lower bound, but it makes
+    # best-first search very greedy), octile distance, or octile distance raised by ALT landmark bounds
+    HEURISTICS = ("euclidean", "octile", "alt")
+
+    def __init__(self, size, obstacles, start, goal, heuristic = "euclidean", landmark_count = 8, base = None, terrain = None):
+
+        # base optionally gives the (passable, neighbor_masks) arrays of a map (see from_map), which obstacles are added on top of.
+        # terrain optionally gives a (Y, X) array of positive per cell costs: a move then costs its length (sqrt(2) for diagonals)
+        # times the average terrain of the two cells, which makes every move cost the same both ways.
+
+        if heuristic not in Grid.HEURISTICS:
+            raise ValueError("Unknown heuristic: {}".format(heuristic))
 
         self._Y, self._X = size
-        self._grid       = np.zeros(size, dtype = np.uint8)
+        self._grid       = None
         self._start      = start
         self._goal       = goal
-        self._obstacles  = obstacles
+        self._obstacles  = [ tuple(obstacle) for obstacle in obstacles ]
+        self._base       = base
+        self._heuristic  = heuristic
+
+        # Padded like _passable, so the array-backed searches can look terrain up by flat index
+        if terrain is not None:
+            terrain = np.asarray(terrain, dtype = np.float64)
+            if terrain.shape != (self._Y, self._X) or not (terrain > 0).all():
+                raise ValueError("terrain must be a {} array of positive costs".format(size))
+            self._terrain = np.zeros((self._Y + 2, self._X + 2))
+            self._terrain[1:-1, 1:-1] = terrain
+            self._diagonal = math.sqrt(2.0)
+            self._cheapest_terrain = float(terrain.min())
+        else:
+            self._terrain = None
+            self._diagonal = 1.0
+
+        self._landmark_count = landmark_count
+        self._landmarks = None
+
+        # Bumped on every obstacle change, so that anything precomputed from the map can tell it is stale
+        self._version = 0
+        self._distance_fields = None
+        self._listeners = []
 
         self._fig = None
         self._img = None
         self._ops_plot = None
         self._space_plot = None
 
-        self.reinit_grid()
+        self._rasterize_obstacles()
+
+    @staticmethod
+    def from_map(path, start, goal, **options):
+        # A Moving AI .map, a .npy array of passable cells or a compiled map; the compiled map is written next to the source on first use
+        from grid_maps import compile_map, open_compiled_map
+        if not path.endswith(".gridmap"):
+            path = compile_map(path)
+        passable, masks = open_compiled_map(path)
+        return Grid(masks.shape, [], start, goal, base = (passable, masks), **options)
 
     def reinit_grid(self):
+
+        # The image for the viz, only allocated once it is drawn
+        if self._grid is None:
+            self._grid = np.zeros((self._Y, self._X), dtype = np.uint8)
+
         start_y, start_x = self._start
         self._grid[start_y,start_x] = Grid.START
 
-        for (y1,y2,x1,x2) in self._obstacles:
-            self._grid[y1:y2, x1:x2] = Grid.OBSTACLE
+        self._grid[~self._passable[1:-1, 1:-1]] = Grid.OBSTACLE
 
         goal_y, goal_x = self._goal
         self._grid[goal_y, goal_x] = Grid.GOAL
@@ -126,22 +190,124 @@ class Grid:
     def start_node(self):
         return GridNode(self, self._start)
 
+    def goal_node(self):
+        return GridNode(self, self._goal)
+
+    def _rasterize_obstacles(self):
+
+        # A mapped file's arrays are used as they are, unless obstacles have to be added to a copy
+        if self._base is not None and not self._obstacles:
+            self._passable, self._neighbor_masks = self._base
+            return
+
+        # Passability mask with a one cell blocked border, so that (y + 1, x + 1) looks up (y, x)
+        # and stepping one cell off the edge needs no bounds check
+        if self._base is not None:
+            passable = np.array(self._base[0], dtype = bool)
+        else:
+            passable = np.zeros((self._Y + 2, self._X + 2), dtype = bool)
+            passable[1:-1, 1:-1] = True
+        for (y1,y2,x1,x2) in self._obstacles:
+            passable[1 + y1:1 + y2, 1 + x1:1 + x2] = False
+
+        self._passable = passable
+        self._neighbor_masks = neighbor_masks(passable)
+
+    def step_costs(self):
+        # Length of a move in each of DIRECTIONS, which is also its cost without terrain. Diagonals are sqrt(2) long
+        # on weighted terrain, but without terrain every move costs 1, diagonals included, as it always has.
+        return [ 1.0 if dy == 0 or dx == 0 else self._diagonal for direction, dy, dx in DIRECTIONS ]
+
+    def move_cost(self, pos, to):
+        (y, x), (to_y, to_x) = pos, to
+        length = 1.0 if y == to_y or x == to_x else self._diagonal
+        if self._terrain is None:
+            return length
+        return length * 0.5 * float(self._terrain[y + 1, x + 1] + self._terrain[to_y + 1, to_x + 1])
+
+    def terrain(self):
+        # The (Y, X) terrain costs, or None for uniform terrain
+        return None if self._terrain is None else self._terrain[1:-1, 1:-1]
+
+    def add_obstacle(self, obstacle):
+        self._obstacles = self._obstacles + [ tuple(obstacle) ]
+        self._obstacles_changed()
+
+    def remove_obstacle(self, obstacle):
+        obstacles = list(self._obstacles)
+        obstacles.remove(tuple(obstacle))
+        self._obstacles = obstacles
+        self._obstacles_changed()
+
+    def add_listener(self, listener):
+        # listener(grid, cells) is called after every obstacle change, with the (y, x) cells whose passability changed
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _obstacles_changed(self):
+        passable = self._passable
+        self._rasterize_obstacles()
+        cells = [ (int(y) - 1, int(x) - 1) for y, x in np.argwhere(passable != self._passable) ]
+        for listener in list(self._listeners):
+            listener(self, cells)
+        self._version += 1
+        self._landmarks = None
+        if self._grid is not None:
+            self._grid[self._grid == Grid.OBSTACLE] = Grid.BLANK
+            self.reinit_grid()
+
+    def distance_fields(self, maxsize = 4):
+        # Cache of reverse distance fields, for many queries against the same goal(s)
+        if self._distance_fields is None:
+            from distance_fields import DistanceFieldCache
+            self._distance_fields = DistanceFieldCache(self, maxsize)
+        return self._distance_fields
+
+    def octile_costs(self):
+        # Cheapest straight and cheapest diagonal move, which octile distance needs to stay a lower bound
+        costs = self.step_costs()
+        straight = min(cost for (direction, dy, dx), cost in zip(DIRECTIONS, costs) if dy == 0 or dx == 0)
+        diagonal = min(cost for (direction, dy, dx), cost in zip(DIRECTIONS, costs) if dy != 0 and dx != 0)
+        if self._terrain is not None:
+            straight, diagonal = straight * self._cheapest_terrain, diagonal * self._cheapest_terrain
+        return straight, diagonal
+
+    def landmarks(self):
+        # Built on first use, which runs a Dijkstra over the whole map per landmark
+        if self._landmarks is None:
+            from landmarks import Landmarks
+            self._landmarks = Landmarks.build(self, self._landmark_count)
+        return self._landmarks
+
+    def set_landmarks(self, landmarks):
+        # e.g. Landmarks.load(grid, path), to skip the preprocessing
+        self._landmarks = landmarks
+
+    def estimate(self, a, b):
+
+        (y, x), (to_y, to_x) = a, b
+        if self._heuristic == "euclidean":
+            return (y - to_y) ** 2.0 + (x - to_x) ** 2.0
+
+        estimate = octile_distance(y - to_y, x - to_x, *self.octile_costs())
+
+        if self._heuristic == "alt":
+            estimate = max(estimate, self.landmarks().lower_bound(a, b))
+        return estimate
+
     def _has_position(self, pos):
 
         # De-structure position
         y, x = pos
 
-        # Check that it is not out of bounds
-        if not ((0 <= y < self._Y) and (0 <= x < self._X)):
-            return False
-
-        # Check that it is not within an obstacle
-        for obstacle in self._obstacles:
-            y1,y2,x1,x2 = obstacle
-            if ((y1 <= y < y2) and (x1 <= x < x2)):
-                return False
+        # Check that it is not out of bounds (only needed for positions further than one cell off the grid) and not within an obstacle
+        return (-1 <= y <= self._Y) and (-1 <= x <= self._X) and bool(self._passable[y + 1, x + 1])
 
-        return True
+    def neighbor_offsets(self, pos):
+        y, x = pos
+        return NEIGHBOR_TABLE[self._neighbor_masks[y, x]]
 
     def _mark_current(self, node):
         if node is None:
@@ -177,12 +343,16 @@ class Grid:
 
     def init_viz(self):
 
+        import matplotlib.pyplot as plt
+
         fig = plt.figure()
         img_plot = plt.subplot(111)
 
         img_plot.axis("off")
         img_plot.set_aspect('auto')
 
+        self.reinit_grid()
+
         self._fig = fig
         self._img = img_plot.imshow(self._grid)
 
@@ -190,6 +360,8 @@ class Grid:
 
     def redraw(self, queued, visited, current, path, snapshot):
 
+        import matplotlib.pyplot as plt
+
         self._mark_queued(queued)
         self._mark_visited(visited)
         self._mark_current(current)
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+from grid import neighbor_masks
+
+# Moving AI .map and .npy grid maps, compiled once into a file of the padded passability mask and neighbor masks
+# that is opened with np.memmap, so solver processes share one copy of a huge map.
+
+# Layout: magic, height and width (uint32), passable uint8 (height + 2, width + 2) with a blocked border,
+# then neighbors uint8 (height, width) with bit i set when DIRECTIONS[i] leads somewhere passable
+MAGIC = b"COTBMAP1"
+HEADER = np.dtype([ ("magic", "S8"), ("height", "<u4"), ("width", "<u4") ])
+
+# Moving AI terrain: ground (.), ground (G) and swamp (S) can be walked on; out of bounds (@, O), trees (T) and water (W) can't
+PASSABLE_TERRAIN = b".GS"
+
+
+def read_moving_ai_map(path):
+
+    with open(path, "rb") as f:
+        header = {}
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError("{}: no map section".format(path))
+            line = line.strip()
+            if line == b"map":
+                break
+            key, value = line.split(None, 1)
+            header[key.decode("ascii")] = value.decode("ascii")
+        height, width = int(header["height"]), int(header["width"])
+        rows = f.read().split()
+
+    if len(rows) < height or any(len(row) != width for row in rows[:height]):
+        raise ValueError("{}: expected {} rows of {} cells".format(path, height, width))
+
+    cells = np.frombuffer(b"".join(rows[:height]), dtype = np.uint8).reshape(height, width)
+    return np.isin(cells, np.frombuffer(PASSABLE_TERRAIN, dtype = np.uint8))
+
+
+def read_map(path):
+    # A (height, width) bool array of passable cells
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode = "r").astype(bool)
+    return read_moving_ai_map(path)
+
+
+def write_compiled_map(cells, path):
+
+    height, width = cells.shape
+    passable = np.zeros((height + 2, width + 2), dtype = bool)
+    passable[1:-1, 1:-1] = cells
+
+    header = np.zeros(1, dtype = HEADER)
+    header["magic"], header["height"], header["width"] = MAGIC, height, width
+
+    # Written under a temporary name and renamed, so that other processes never map a half written file
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(passable.astype(np.uint8).tobytes())
+        f.write(neighbor_masks(passable).tobytes())
+    os.replace(temporary_path, path)
+
+
+def compiled_map_path(path):
+    return os.path.splitext(path)[0] + ".gridmap"
+
+
+def compile_map(path, compiled_path = None):
+
+    # Converts the map unless an up to date compiled file already exists, and returns the compiled file's path
+    compiled_path = compiled_path or compiled_map_path(path)
+    if not os.path.exists(compiled_path) or os.path.getmtime(compiled_path) < os.path.getmtime(path):
+        write_compiled_map(read_map(path), compiled_path)
+    return compiled_path
+
+
+def open_compiled_map(path):
+
+    # Returns read only (passable, neighbor_masks) views of the file, as Grid uses them
+    header = np.fromfile(path, dtype = HEADER, count = 1)
+    if len(header) == 0 or header["magic"][0] != MAGIC:
+        raise ValueError("{} is not a compiled grid map".format(path))
+    height, width = int(header["height"][0]), int(header["width"][0])
+
+    data = np.memmap(path, dtype = np.uint8, mode = "r", offset = HEADER.itemsize)
+    passable = data[:(height + 2) * (width + 2)].view(bool).reshape(height + 2, width + 2)
+    masks = data[(height + 2) * (width + 2):(height + 2) * (width + 2) + height * width].reshape(height, width)
+    return passable, masks
+
+
+if __name__ == "__main__":
+    import sys
+    for path in sys.argv[1:]:
+        print(compile_map(path))
@@ -0,0 +1,228 @@
+import heapq
+from collections import deque
+import numpy as np
+from grid import GridNode, DIRECTIONS, octile_distance
+
+# A*, Dijkstra and breadth-first search specialised to Grid, over flat indices into the padded passability mask, with
+# the search state in NumPy arrays. GridNodes are only made for the final path (or for the viz).
+
+MODES = ("astar", "dijkstra", "breadthfirst")
+
+DIRECTION_NAMES = { (dy, dx): direction for direction, dy, dx in DIRECTIONS }
+
+
+def grid_search(grid, start = None, goal = None, mode = "astar"):
+
+    # Returns the goal GridNode, with the usual path() back to the start, or None if the goal can't be reached
+    start = grid._start if start is None else start
+    goal  = grid._goal  if goal  is None else goal
+
+    search = _search(grid, start, goal, mode, report = False)
+    for state in search:
+        pass
+
+    return _path_node(grid, start, goal, state[2]) if state[0] else None
+
+
+def grid_search_coroutine(start, mode = "astar"):
+
+    # The same search, following the algorithm coroutine protocol so demonstrate.py can draw it.
+    # visited and queue are views that only create GridNodes when the viz iterates them.
+    if (yield) == -1:
+        return
+
+    grid = start._grid
+    start, goal = start.pos(), grid._goal
+    width = grid._X + 2
+
+    for found, current, parents, closed, frontier in _search(grid, start, goal, mode, report = True):
+        if found:
+            node = _path_node(grid, start, goal, parents)
+        else:
+            node = GridNode(grid, cell_position(current, width))
+        if mode == "breadthfirst":
+            # Breadth-first search closes cells as it queues them, so everything queued is live and the rest was expanded
+            visited = CellView(grid, lambda: np.setdiff1d(np.flatnonzero(closed), [ entry[-1] for entry in frontier ]))
+            queue   = CellView(grid, lambda: (entry[-1] for entry in frontier))
+        else:
+            visited = CellView(grid, lambda: np.flatnonzero(closed))
+            queue   = CellView(grid, lambda: (entry[-1] for entry in frontier if not closed[entry[-1]]))
+        if (yield node, visited, queue) == -1:
+            return
+
+
+def grid_a_star_search(start):
+    return grid_search_coroutine(start, "astar")
+
+def grid_dijkstra_search(start):
+    return grid_search_coroutine(start, "dijkstra")
+
+def grid_breadth_first_search(start):
+    return grid_search_coroutine(start, "breadthfirst")
+
+
+def distance_field(grid, source):
+
+    # Cost of the cheapest path from source to every cell as a float32 (Y, X) array, inf where unreachable.
+    # Every move can be reversed at the same cost, so this is also every cell's distance to source.
+    g = np.full((grid._Y + 2) * (grid._X + 2), np.inf, dtype = np.float32)
+    for state in _search(grid, source, None, "dijkstra", report = False, g = g):
+        pass
+    return g.reshape(grid._Y + 2, grid._X + 2)[1:-1, 1:-1]
+
+
+def lower_bound(grid, goal, straight, diagonal):
+
+    # Heuristic for a padded flat index: the octile distance to the goal, raised by the landmark bound when the grid uses ALT
+    width = grid._X + 2
+    goal_y, goal_x = goal
+    landmark_bound = grid.landmarks().bound_to(goal) if grid._heuristic == "alt" else None
+
+    def heuristic(index):
+        y, x = cell_position(index, width)
+        estimate = octile_distance(y - goal_y, x - goal_x, straight, diagonal)
+        if landmark_bound is not None:
+            estimate = max(estimate, landmark_bound(index))
+        return estimate
+
+    return heuristic
+
+
+def _search(grid, start, goal, mode, report, g = None):
+
+    # With no goal, expands every reachable cell (and leaves their costs in g)
+    if mode not in MODES:
+        raise ValueError("Unknown grid search mode: {}".format(mode))
+    if goal is None and mode == "astar":
+        raise ValueError("A* needs a goal")
+
+    width = grid._X + 2
+    size  = (grid._Y + 2) * width
+
+    passable = grid._passable.ravel()
+    offsets  = [ dy * width + dx for direction, dy, dx in DIRECTIONS ]
+    costs    = grid.step_costs()
+    moves    = list(zip(offsets, costs))
+
+    # On weighted terrain a move costs its length times the average terrain of the two cells
+    terrain  = None if grid._terrain is None else grid._terrain.ravel()
+
+    straight, diagonal = grid.octile_costs()
+
+    start_index = cell_index(start, width)
+    goal_index  = -1 if goal is None else cell_index(goal, width)
+
+    g       = np.full(size, np.inf, dtype = np.float32) if g is None else g
+    parents = np.full(size, -1, dtype = np.int32)
+    closed  = np.zeros(size, dtype = bool)
+
+    g[start_index] = 0.0
+
+    if not passable[start_index] or (goal is not None and not passable[goal_index]):
+        yield False, start_index, parents, closed, []
+        return
+
+    # Breadth-first search marks cells closed when they are first reached, the others when they are expanded
+    if mode == "breadthfirst":
+
+        frontier = deque([ (start_index,) ])
+        closed[start_index] = True
+
+        while frontier:
+
+            (index,) = frontier.popleft()
+
+            if index == goal_index:
+                yield True, index, parents, closed, frontier
+                return
+
+            for offset, cost in moves:
+                child = index + offset
+                if passable[child] and not closed[child]:
+                    closed[child] = True
+                    parents[child] = index
+                    g[child] = g[index] + (cost if terrain is None else cost * 0.5 * (terrain[index] + terrain[child]))
+                    frontier.append((child,))
+
+            if report:
+                yield False, index, parents, closed, frontier
+
+    else:
+
+        if mode == "dijkstra":
+            heuristic = lambda index: 0.0
+        else:
+            heuristic = lower_bound(grid, goal, straight, diagonal)
+
+        frontier = [ (heuristic(start_index), start_index) ]
+
+        while frontier:
+
+            f, index = heapq.heappop(frontier)
+
+            # Stale entry for a cell that was reached more cheaply later
+            if closed[index]:
+                continue
+            closed[index] = True
+
+            if index == goal_index:
+                yield True, index, parents, closed, frontier
+                return
+
+            index_cost = float(g[index])
+
+            for offset, cost in moves:
+                child = index + offset
+                if not passable[child] or closed[child]:
+                    continue
+                child_cost = index_cost + (cost if terrain is None else cost * 0.5 * float(terrain[index] + terrain[child]))
+                if child_cost < g[child]:
+                    g[child] = child_cost
+                    parents[child] = index
+                    heapq.heappush(frontier, (child_cost + heuristic(child), child))
+
+            if report:
+                yield False, index, parents, closed, frontier
+
+    yield False, start_index, parents, closed, frontier
+
+
+def cell_index(pos, width):
+    y, x = pos
+    return (y + 1) * width + (x + 1)
+
+def cell_position(index, width):
+    y, x = divmod(int(index), width)
+    return y - 1, x - 1
+
+def _path_node(grid, start, goal, parents):
+
+    # Walk the parent indices back from the goal, then rebuild the path as GridNodes from the start
+    width = grid._X + 2
+    indices = [ cell_index(goal, width) ]
+    while indices[-1] != cell_index(start, width):
+        indices.append(int(parents[indices[-1]]))
+
+    return node_chain(grid, [ cell_position(index, width) for index in reversed(indices) ])
+
+def node_chain(grid, positions):
+
+    # GridNodes linked by backlinks along a list of adjacent positions; returns the last one
+    node = GridNode(grid, positions[0])
+    for (y, x) in positions[1:]:
+        node_y, node_x = node.pos()
+        node = node._make_node((y, x), DIRECTION_NAMES[(y - node_y, x - node_x)])
+    return node
+
+
+class CellView:
+
+    # Iterable of GridNodes over some cell indices, only materialized when iterated
+
+    def __init__(self, grid, indices):
+        self._grid = grid
+        self._indices = indices
+
+    def __iter__(self):
+        width = self._grid._X + 2
+        return (GridNode(self._grid, cell_position(index, width)) for index in self._indices())
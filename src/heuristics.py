@@ -0,0 +1,11 @@
+# Scores a list of nodes in one call through their class's batch_distance(nodes) staticmethod, if it has one,
+# and through each node's distance() otherwise.
+
+
+def distances(nodes):
+    if not nodes:
+        return []
+    batch_distance = getattr(type(nodes[0]), "batch_distance", None)
+    if batch_distance is None:
+        return [ node.distance() for node in nodes ]
+    return batch_distance(nodes)
@@ -0,0 +1,255 @@
+import math, pickle
+import numpy as np
+from grid import Grid, neighbor_masks
+from grid_search import grid_search, distance_field, node_chain, octile_distance
+from priority_queue import PriorityQueue
+
+# HPA* (Botea, Müller & Schaeffer, 2004) for large Grids: clusters joined by border entrances form a small abstract
+# graph, which is searched and then refined cluster by cluster. Paths are near-optimal, not always shortest.
+
+# Runs of crossable border cells at least this long get an entrance at both ends
+LONG_RUN = 6
+
+
+class Abstraction:
+
+    def __init__(self, grid, cluster_size, entrances, intra):
+
+        self._grid = grid
+        self._cluster_size = cluster_size
+
+        # (cluster, other cluster) -> [ (cell, other cell, cost) ] crossings, for each cluster and the neighbors right, below, below-right and below-left of it
+        self._entrances = entrances
+
+        # cluster -> { entrance: { entrance: cost within the cluster } }
+        self._intra = intra
+
+        self._link_entrances()
+
+        grid.add_listener(self._cells_changed)
+
+    @staticmethod
+    def build(grid, cluster_size = 16):
+        abstraction = Abstraction(grid, cluster_size, {}, {})
+        abstraction._rebuild(abstraction._clusters())
+        return abstraction
+
+    @staticmethod
+    def load(grid, path):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state["shape"] != (grid._Y, grid._X):
+            raise ValueError("{} was built for a {} grid".format(path, state["shape"]))
+        return Abstraction(grid, state["cluster_size"], state["entrances"], state["intra"])
+
+    def save(self, path):
+        state = { "shape": (self._grid._Y, self._grid._X), "cluster_size": self._cluster_size, "entrances": self._entrances, "intra": self._intra }
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol = pickle.HIGHEST_PROTOCOL)
+
+    def close(self):
+        # Stops following obstacle changes
+        self._grid.remove_listener(self._cells_changed)
+
+    def __len__(self):
+        # Number of abstract nodes
+        return len(self._inter)
+
+    def path(self, start = None, goal = None):
+
+        # Returns the goal GridNode, with the usual path() back to the start, or None if the goal can't be reached
+        grid = self._grid
+        start = tuple(grid._start if start is None else start)
+        goal  = tuple(grid._goal  if goal  is None else goal)
+
+        if not grid._has_position(start) or not grid._has_position(goal):
+            return None
+        if start == goal:
+            return node_chain(grid, [ start ])
+
+        start_edges = self._connect(start)
+        goal_edges  = { entrance: cost for entrance, cost in self._connect(goal).items() }
+        if self._cluster(start) == self._cluster(goal):
+            direct = self._local_distance(start, goal)
+            if direct < math.inf:
+                start_edges[goal] = direct
+
+        abstract_path = self._search(start, goal, start_edges, goal_edges)
+        if abstract_path is None:
+            return None
+
+        # Refine every abstract edge: a single step between clusters, or a search inside one cluster
+        positions = [ start ]
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            if self._cluster(a) != self._cluster(b):
+                positions.append(b)
+            else:
+                positions.extend(self._local_path(a, b)[1:])
+
+        return node_chain(grid, positions)
+
+    def _search(self, start, goal, start_edges, goal_edges):
+
+        # A* over the abstract graph, with the start and goal spliced in
+        straight, diagonal = self._grid.octile_costs()
+        goal_y, goal_x = goal
+
+        def heuristic(cell):
+            return octile_distance(cell[0] - goal_y, cell[1] - goal_x, straight, diagonal)
+
+        def neighbors(cell):
+            if cell == start:
+                edges = list(start_edges.items())
+            else:
+                edges = list(self._intra[self._cluster(cell)][cell].items())
+            edges.extend(self._inter.get(cell, {}).items())
+            if cell in goal_edges:
+                edges.append((goal, goal_edges[cell]))
+            return edges
+
+        costs, parents = { start: 0.0 }, { start: None }
+        queue = PriorityQueue()
+        queue.push(start, heuristic(start))
+
+        while len(queue) > 0:
+
+            cell = queue.pop()
+            if cell == goal:
+                path = [ cell ]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1]
+
+            for neighbor, cost in neighbors(cell):
+                neighbor_cost = costs[cell] + cost
+                if neighbor not in costs or neighbor_cost < costs[neighbor]:
+                    costs[neighbor], parents[neighbor] = neighbor_cost, cell
+                    queue.push(neighbor, neighbor_cost + heuristic(neighbor))
+
+        return None
+
+    def _cluster(self, cell):
+        return cell[0] // self._cluster_size, cell[1] // self._cluster_size
+
+    def _clusters(self):
+        rows, columns = -(-self._grid._Y // self._cluster_size), -(-self._grid._X // self._cluster_size)
+        return [ (row, column) for row in range(rows) for column in range(columns) ]
+
+    def _bounds(self, cluster):
+        y, x = cluster[0] * self._cluster_size, cluster[1] * self._cluster_size
+        return y, min(y + self._cluster_size, self._grid._Y), x, min(x + self._cluster_size, self._grid._X)
+
+    def _cluster_grid(self, cluster):
+
+        # A Grid over just this cluster (walled off from its neighbors), and the offset of its (0, 0)
+        y1, y2, x1, x2 = self._bounds(cluster)
+        passable = np.array(self._grid._passable[y1:y2 + 2, x1:x2 + 2], dtype = bool)
+        passable[0, :] = passable[-1, :] = passable[:, 0] = passable[:, -1] = False
+        terrain = self._grid.terrain()
+        if terrain is not None:
+            terrain = terrain[y1:y2, x1:x2]
+        local = Grid((y2 - y1, x2 - x1), [], (0, 0), (0, 0), base = (passable, neighbor_masks(passable)), terrain = terrain)
+        return local, (y1, x1)
+
+    def _connect(self, cell):
+        # Cost from a cell to every entrance of its cluster that it can reach
+        cluster = self._cluster(cell)
+        local, (y0, x0) = self._cluster_grid(cluster)
+        field = distance_field(local, (cell[0] - y0, cell[1] - x0))
+        return { entrance: float(field[entrance[0] - y0, entrance[1] - x0]) for entrance in self._intra[cluster] if field[entrance[0] - y0, entrance[1] - x0] < math.inf }
+
+    def _local_distance(self, a, b):
+        local, (y0, x0) = self._cluster_grid(self._cluster(a))
+        return float(distance_field(local, (a[0] - y0, a[1] - x0))[b[0] - y0, b[1] - x0])
+
+    def _local_path(self, a, b):
+        local, (y0, x0) = self._cluster_grid(self._cluster(a))
+        node = grid_search(local, (a[0] - y0, a[1] - x0), (b[0] - y0, b[1] - x0))
+        return [ (y + y0, x + x0) for y, x in (node.pos() for node in reversed(node.path())) ]
+
+    def _border_entrances(self, cluster, other):
+
+        passable = self._grid._passable
+        def free(cell):
+            return bool(passable[cell[0] + 1, cell[1] + 1])
+
+        dy, dx = other[0] - cluster[0], other[1] - cluster[1]
+        y1, y2, x1, x2 = self._bounds(cluster)
+
+        # Diagonal clusters only meet at a corner
+        if dy != 0 and dx != 0:
+            a = (y2 - 1, x2 - 1 if dx > 0 else x1)
+            b = (a[0] + dy, a[1] + dx)
+            return [ (a, b, self._grid.move_cost(a, b)) ] if free(a) and free(b) else []
+
+        # This cluster's cells along the border, and the cells across from them
+        if dx != 0:
+            inside = [ (y, x2 - 1) for y in range(y1, min(y2, self._bounds(other)[1])) ]
+        else:
+            inside = [ (y2 - 1, x) for x in range(x1, min(x2, self._bounds(other)[3])) ]
+        across = [ (y + dy, x + dx) for y, x in inside ]
+
+        crossable = [ free(a) and free(b) for a, b in zip(inside, across) ]
+        entrances = []
+
+        # One entrance in the middle of every run of straight crossings, or one at each end of a long run
+        i = 0
+        while i < len(inside):
+            if not crossable[i]:
+                i += 1
+                continue
+            j = i
+            while j + 1 < len(inside) and crossable[j + 1]:
+                j += 1
+            for k in ([ i, j ] if j - i + 1 >= LONG_RUN else [ (i + j) // 2 ]):
+                entrances.append((inside[k], across[k], self._grid.move_cost(inside[k], across[k])))
+            i = j + 1
+
+        # Diagonal crossings where neither end can cross straight over
+        for i in range(len(inside) - 1):
+            for a, b, a_across, b_across in [ (inside[i], across[i + 1], across[i], inside[i + 1]), (inside[i + 1], across[i], across[i + 1], inside[i]) ]:
+                if free(a) and free(b) and not free(a_across) and not free(b_across):
+                    entrances.append((a, b, self._grid.move_cost(a, b)))
+
+        return entrances
+
+    def _rebuild(self, clusters):
+
+        # New entrances on every border of the clusters, then new intra-cluster costs for them and their neighbors
+        clusters = set(clusters)
+        touched = set()
+        for cluster in clusters:
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    other = (cluster[0] + dy, cluster[1] + dx)
+                    if other != cluster and 0 <= other[0] * self._cluster_size < self._grid._Y and 0 <= other[1] * self._cluster_size < self._grid._X:
+                        touched.add(other)
+                        first, second = min(cluster, other), max(cluster, other)
+                        self._entrances[(first, second)] = self._border_entrances(first, second)
+        touched |= clusters
+
+        self._link_entrances()
+
+        for cluster in touched:
+            cells = self._cluster_entrances.get(cluster, set())
+            local, (y0, x0) = self._cluster_grid(cluster)
+            self._intra[cluster] = {}
+            for cell in cells:
+                field = distance_field(local, (cell[0] - y0, cell[1] - x0))
+                self._intra[cluster][cell] = { other: float(field[other[0] - y0, other[1] - x0]) for other in cells
+                                               if other != cell and field[other[0] - y0, other[1] - x0] < math.inf }
+
+    def _link_entrances(self):
+        # The crossings as edges in both directions, and each cluster's entrance cells
+        self._inter = {}
+        self._cluster_entrances = {}
+        for crossings in self._entrances.values():
+            for a, b, cost in crossings:
+                self._inter.setdefault(a, {})[b] = cost
+                self._inter.setdefault(b, {})[a] = cost
+                self._cluster_entrances.setdefault(self._cluster(a), set()).add(a)
+                self._cluster_entrances.setdefault(self._cluster(b), set()).add(b)
+
+    def _cells_changed(self, grid, cells):
+        if cells:
+            self._rebuild({ self._cluster(cell) for cell in cells })
@@ -0,0 +1,90 @@
+import math
+
+
+def ida_star_search(start, yield_every = 10000):
+
+    # Iterative-deepening A*: repeated depth-first searches, each cut off where g + h exceeds a bound,
+    # with the bound raised to the smallest f that was cut off last time.
+    # Only the current path is kept, so memory is linear in the solution depth. The search walks a
+    # single copy of the start around with apply/undo rather than allocating a child per move.
+    # Requires nodes with moves(), apply(move) -> undo move, undo(move), child(move), copy(), and unit move costs.
+
+    if (yield) == -1:
+        return
+
+    node  = start.copy()
+    bound = node.distance()
+
+    # No visited set or queue exists, but the viz protocol expects them
+    visited, queue = set(), []
+
+    expansions = 0
+    moves = []
+    found = node.is_goal()
+
+    while not found:
+
+        next_bound = math.inf
+
+        # One frame per node on the current path: its remaining moves. undos[i] reverts the move that led to frame i + 1.
+        frames = [ iter(node.moves()) ]
+        undos  = []
+
+        while frames:
+
+            move = next(frames[-1], None)
+
+            if move is None:
+                frames.pop()
+                if undos:
+                    node.undo(undos.pop())
+                    moves.pop()
+                continue
+
+            # Don't slide a piece straight back to where it came from
+            if undos and move[1] == undos[-1][1]:
+                continue
+
+            undo = node.apply(move)
+            f = len(undos) + 1 + node.distance()
+
+            if f > bound:
+                next_bound = min(next_bound, f)
+                node.undo(undo)
+                continue
+
+            undos.append(undo)
+            moves.append(move)
+
+            if node.is_goal():
+                found = True
+                break
+
+            frames.append(iter(node.moves()))
+
+            # Coroutine hack to communicate algorithm state back to viz (and to allow cancelling a long iteration)
+            expansions += 1
+            if expansions % yield_every == 0:
+                if (yield node.copy(), visited, queue) == -1:
+                    return
+
+        if found:
+            break
+
+        # Nothing within any bound: the goal is unreachable
+        if next_bound == math.inf:
+            return
+
+        bound = next_bound
+
+        # Coroutine hack to communicate algorithm state back to viz
+        if (yield start, visited, queue) == -1:
+            return
+
+    # Rebuild the solution as a chain of nodes so that path() works as usual
+    node = start
+    for move in moves:
+        node = node.child(move)
+
+    # Coroutine hack to communicate algorithm state back to viz
+    yield node, visited, queue
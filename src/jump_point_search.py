@@ -0,0 +1,186 @@
+import heapq
+import numpy as np
+from grid import GridNode, DIRECTIONS
+from grid_search import CellView, cell_index, cell_position, node_chain, octile_distance, lower_bound
+
+# Jump Point Search (Harabor & Grastien, 2011) for Grid: only jump points enter the open list, so open areas are
+# crossed without expanding every cell. Needs uniform straight and diagonal costs, i.e. no terrain.
+
+
+def jump_point_search(start):
+
+    # Follows the algorithm coroutine protocol; the goal node's path() visits every cell, not just the jump points
+    if (yield) == -1:
+        return
+
+    grid = start._grid
+    width = grid._X + 2
+
+    for found, current, parents, closed, frontier in _search(grid, start.pos(), grid._goal, report = True):
+        if found:
+            node = _path_node(grid, current, parents)
+        else:
+            node = GridNode(grid, cell_position(current, width))
+        visited = CellView(grid, lambda: np.flatnonzero(closed))
+        queue   = CellView(grid, lambda: (entry[-1] for entry in frontier if not closed[entry[-1]]))
+        if (yield node, visited, queue) == -1:
+            return
+
+
+def jump_point_path(grid, start = None, goal = None):
+
+    # Returns the goal GridNode, with the usual path() back to the start, or None if the goal can't be reached
+    start = grid._start if start is None else start
+    goal  = grid._goal  if goal  is None else goal
+
+    for found, current, parents, closed, frontier in _search(grid, start, goal, report = False):
+        pass
+
+    return _path_node(grid, current, parents) if found else None
+
+
+def _search(grid, start, goal, report):
+
+    width = grid._X + 2
+    size  = (grid._Y + 2) * width
+    passable = grid._passable.ravel()
+
+    if grid._terrain is not None:
+        raise ValueError("Jump point search needs uniform terrain")
+
+    costs = grid.step_costs()
+    straight_costs = { cost for (direction, dy, dx), cost in zip(DIRECTIONS, costs) if dy == 0 or dx == 0 }
+    diagonal_costs = { cost for (direction, dy, dx), cost in zip(DIRECTIONS, costs) if dy != 0 and dx != 0 }
+    if len(straight_costs) != 1 or len(diagonal_costs) != 1:
+        raise ValueError("Jump point search needs uniform straight and diagonal move costs")
+    straight, diagonal = straight_costs.pop(), diagonal_costs.pop()
+
+    start_index = cell_index(start, width)
+    goal_index  = cell_index(goal, width)
+
+    g       = np.full(size, np.inf, dtype = np.float32)
+    parents = np.full(size, -1, dtype = np.int32)
+    closed  = np.zeros(size, dtype = bool)
+
+    if not passable[start_index] or not passable[goal_index]:
+        yield False, start_index, parents, closed, []
+        return
+
+    heuristic = lower_bound(grid, goal, straight, diagonal)
+
+    def jump_straight(index, dy, dx):
+
+        # Run along a row or column until something forces a turn
+        step = dy * width + dx
+        side = width if dx else 1
+        while True:
+            index += step
+            if not passable[index]:
+                return None
+            if index == goal_index:
+                return index
+            if (not passable[index + side] and passable[index + side + step]) or (not passable[index - side] and passable[index - side + step]):
+                return index
+
+    def jump(index, dy, dx):
+
+        if dy == 0 or dx == 0:
+            return jump_straight(index, dy, dx)
+
+        # Run along a diagonal, stopping where a forced neighbor appears or where one of the two straight runs it spawns finds a jump point
+        step = dy * width + dx
+        while True:
+            index += step
+            if not passable[index]:
+                return None
+            if index == goal_index:
+                return index
+            if (not passable[index - dx] and passable[index - dx + dy * width]) or (not passable[index - dy * width] and passable[index - dy * width + dx]):
+                return index
+            if jump_straight(index, 0, dx) is not None or jump_straight(index, dy, 0) is not None:
+                return index
+
+    def directions(index):
+
+        parent = int(parents[index])
+        if parent < 0:
+            return [ (dy, dx) for direction, dy, dx in DIRECTIONS ]
+
+        # Direction of travel into this node, as unit steps
+        (y, x), (parent_y, parent_x) = cell_position(index, width), cell_position(parent, width)
+        dy, dx = (y > parent_y) - (y < parent_y), (x > parent_x) - (x < parent_x)
+
+        if dy != 0 and dx != 0:
+            pruned = [ (0, dx), (dy, 0), (dy, dx) ]
+            if not passable[index - dx]:
+                pruned.append((dy, -dx))
+            if not passable[index - dy * width]:
+                pruned.append((-dy, dx))
+        elif dx != 0:
+            pruned = [ (0, dx) ]
+            for side in (1, -1):
+                if not passable[index + side * width]:
+                    pruned.append((side, dx))
+        else:
+            pruned = [ (dy, 0) ]
+            for side in (1, -1):
+                if not passable[index + side]:
+                    pruned.append((dy, side))
+        return pruned
+
+    g[start_index] = 0.0
+    frontier = [ (heuristic(start_index), start_index) ]
+
+    while frontier:
+
+        f, index = heapq.heappop(frontier)
+
+        # Stale entry for a jump point that was reached more cheaply later
+        if closed[index]:
+            continue
+        closed[index] = True
+
+        if index == goal_index:
+            yield True, index, parents, closed, frontier
+            return
+
+        index_cost = float(g[index])
+        y, x = cell_position(index, width)
+
+        for dy, dx in directions(index):
+
+            jump_point = jump(index, dy, dx)
+            if jump_point is None or closed[jump_point]:
+                continue
+
+            jump_y, jump_x = cell_position(jump_point, width)
+            jump_cost = index_cost + octile_distance(jump_y - y, jump_x - x, straight, diagonal)
+            if jump_cost < g[jump_point]:
+                g[jump_point] = jump_cost
+                parents[jump_point] = index
+                heapq.heappush(frontier, (jump_cost + heuristic(jump_point), jump_point))
+
+        if report:
+            yield False, index, parents, closed, frontier
+
+    yield False, start_index, parents, closed, frontier
+
+
+def _path_node(grid, goal_index, parents):
+
+    # Jump points are joined by straight or diagonal runs, so fill in the cells between them
+    width = grid._X + 2
+    jump_points = [ goal_index ]
+    while parents[jump_points[-1]] >= 0:
+        jump_points.append(int(parents[jump_points[-1]]))
+    jump_points.reverse()
+
+    positions = [ cell_position(jump_points[0], width) ]
+    for jump_point in jump_points[1:]:
+        (y, x), (to_y, to_x) = positions[-1], cell_position(jump_point, width)
+        dy, dx = (to_y > y) - (to_y < y), (to_x > x) - (to_x < x)
+        while (y, x) != (to_y, to_x):
+            y, x = y + dy, x + dx
+            positions.append((y, x))
+
+    return node_chain(grid, positions)
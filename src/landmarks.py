@@ -0,0 +1,74 @@
+import numpy as np
+from grid_search import distance_field, cell_index
+
+# ALT heuristics for Grid (Goldberg & Harrelson, 2005): exact distances from a few landmark cells bound d(v, goal)
+# below by |d(L, goal) - d(L, v)|. Tables are float32, a row per padded flat index, NaN where unreachable.
+
+
+class Landmarks:
+
+    def __init__(self, grid, cells, tables):
+        self._grid   = grid
+        self.cells   = cells
+        self._tables = tables
+
+    @staticmethod
+    def build(grid, k = 8):
+
+        # Farthest point selection: start from the cell farthest from some arbitrary cell, then keep adding
+        # the cell farthest from every landmark chosen so far. Landmarks on the edges of the map give the
+        # tightest bounds, since they sit "behind" the most start/goal pairs.
+        width = grid._X + 2
+        tables = np.full(((grid._Y + 2) * width, k), np.nan, dtype = np.float32)
+
+        passable = np.argwhere(grid._passable[1:-1, 1:-1])
+        if len(passable) == 0:
+            return Landmarks(grid, [], tables[:, :0])
+
+        nearest = distance_field(grid, tuple(passable[0]))
+        cells = []
+
+        for i in range(k):
+
+            reachable = np.isfinite(nearest)
+            farthest = np.where(reachable, nearest, -1.0)
+            cell = np.unravel_index(int(np.argmax(farthest)), farthest.shape)
+            cell = int(cell[0]), int(cell[1])
+            if cell in cells:
+                break
+
+            field = distance_field(grid, cell)
+            padded = np.full((grid._Y + 2, width), np.nan, dtype = np.float32)
+            padded[1:-1, 1:-1] = np.where(np.isfinite(field), field, np.nan)
+            tables[:, i] = padded.ravel()
+
+            nearest = field if not cells else np.minimum(nearest, field)
+            cells.append(cell)
+
+        return Landmarks(grid, cells, np.ascontiguousarray(tables[:, :len(cells)]))
+
+    @staticmethod
+    def load(grid, path):
+        with np.load(path) as data:
+            return Landmarks(grid, [ tuple(int(v) for v in cell) for cell in data["cells"] ], data["tables"])
+
+    def save(self, path):
+        np.savez(path, cells = np.array(self.cells, dtype = np.int32).reshape(-1, 2), tables = self._tables)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def bound_to(self, goal):
+
+        # Lower bound on the cost from a padded flat index to goal. NaNs (landmarks that can't reach one of
+        # the cells) drop out of the max, as fmax ignores them.
+        tables = self._tables
+        goal_row = tables[cell_index(goal, self._grid._X + 2)]
+
+        def bound(index):
+            return float(np.fmax.reduce(np.abs(tables[index] - goal_row), initial = 0.0))
+
+        return bound
+
+    def lower_bound(self, a, b):
+        return self.bound_to(b)(cell_index(a, self._grid._X + 2))
@@ -0,0 +1,107 @@
+import os, struct, hashlib
+from bisect import bisect_left
+import numpy as np
+
+# A read-only word list in one memory-mapped file. Words are sorted by (length, word), so every run of
+# equal-length words is already a fixed width matrix that can be used without copying.
+
+# Layout (little endian): magic, word count and bucket count (uint32), a (length, first word, word count)
+# uint32 triple per bucket, uint32 offsets[word count + 1] into the blob, then the blob of latin-1 words
+MAGIC = b"COTBLEX1"
+ENCODING = "latin-1"
+
+
+def write_lexicon(words, path):
+
+    words = sorted(set(words), key = lambda word: (len(word), word))
+
+    buckets = []
+    for index, word in enumerate(words):
+        if not buckets or buckets[-1][0] != len(word):
+            buckets.append([len(word), index, 0])
+        buckets[-1][2] += 1
+
+    blob    = "".join(words).encode(ENCODING, errors = "replace")
+    offsets = np.zeros(len(words) + 1, dtype = "<u4")
+    offsets[1:] = np.cumsum([ len(word) for word in words ])
+
+    # Write to a temporary file and rename, so a concurrently starting process never maps a half written lexicon
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", len(words), len(buckets)))
+        f.write(np.asarray(buckets, dtype = "<u4").tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(temporary_path, path)
+
+
+class CompiledLexicon:
+
+    def __init__(self, path):
+
+        # Mapped read-only, so every process that opens the same file shares the same pages
+        self._data = np.memmap(path, dtype = np.uint8, mode = "r")
+
+        if self._data[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError("{} is not a compiled lexicon".format(path))
+
+        position = len(MAGIC)
+        self._count, bucket_count = struct.unpack("<II", self._data[position:position + 8].tobytes())
+        position += 8
+
+        bucket_table = self._data[position:position + 12 * bucket_count].view("<u4").reshape((bucket_count, 3))
+        position += 12 * bucket_count
+
+        self._offsets = self._data[position:position + 4 * (self._count + 1)].view("<u4")
+        position += 4 * (self._count + 1)
+
+        self._blob = self._data[position:]
+
+        # Zero-copy (word count, length) views into the blob, one per word length
+        self.buckets = {}
+        for length, first, count in bucket_table.tolist():
+            start = int(self._offsets[first])
+            self.buckets[length] = self._blob[start:start + length * count].reshape((count, length))
+
+    def __contains__(self, word):
+        if not isinstance(word, str):
+            return False
+        bucket = self.buckets.get(len(word))
+        if bucket is None:
+            return False
+        key  = word.encode(ENCODING, errors = "replace")
+        rows = _Rows(bucket)
+        i = bisect_left(rows, key)
+        return i < len(rows) and rows[i] == key
+
+    def word(self, index):
+        # Words are numbered in (length, word) order, as they are iterated
+        return self._blob[int(self._offsets[index]):int(self._offsets[index + 1])].tobytes().decode(ENCODING)
+
+    def __iter__(self):
+        for length in sorted(self.buckets):
+            bucket = self.buckets[length]
+            for i in range(len(bucket)):
+                yield bucket[i].tobytes().decode(ENCODING)
+
+    def __len__(self):
+        return self._count
+
+    def fingerprint(self):
+        # Changes whenever the compiled file does, for anything derived from the words and cached elsewhere
+        return hashlib.blake2b(self._data, digest_size = 16).hexdigest()
+
+
+class _Rows:
+
+    # Sequence of a bucket's rows as bytes, for bisect
+
+    def __init__(self, matrix):
+        self._matrix = matrix
+
+    def __len__(self):
+        return len(self._matrix)
+
+    def __getitem__(self, i):
+        return self._matrix[i].tobytes()
@@ -0,0 +1,72 @@
+import os, pickle
+from collections import OrderedDict
+
+# A bounded LRU memo with hit / miss counters, which can be saved to disk and loaded again.
+
+_MISSING = object()
+
+
+class LRUCache:
+
+    def __init__(self, maxsize = 100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default = None):
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last = False)
+
+    def __contains__(self, key):
+        # Doesn't count as a hit or a miss, or make the entry recently used
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self._entries) > maxsize:
+            self._entries.popitem(last = False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self, path, fingerprint = None):
+        # fingerprint identifies whatever the values were computed from, so load() can tell when they no longer apply.
+        # Written under a temporary name and renamed, so a crash never leaves a truncated cache behind
+        temporary_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary_path, "wb") as f:
+            pickle.dump({ "fingerprint": fingerprint, "entries": list(self._entries.items()) }, f, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    def load(self, path, fingerprint = None):
+        # Adds the saved entries, as least recently used, to whatever is cached already. A cache saved with a
+        # different fingerprint is left alone and False returned.
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        if not isinstance(saved, dict) or saved.get("fingerprint") != fingerprint:
+            return False
+        current = list(self._entries.items())
+        self._entries = OrderedDict(saved["entries"])
+        for key, value in current:
+            self[key] = value
+        self.resize(self.maxsize)
+        return True
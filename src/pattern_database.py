@@ -0,0 +1,133 @@
+import os, hashlib
+from collections import deque
+import numpy as np
+
+# Additive pattern databases for the sliding puzzle: a backwards BFS per disjoint pattern of pieces counts only that
+# pattern's moves, so the tables sum to an admissible heuristic. They're cached in one memory-mapped file per puzzle.
+
+CACHE_DIR = os.environ.get("COTB_PDB_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pattern_databases"))
+
+UNREACHED = 255
+
+
+def default_patterns(side_length):
+    # Consecutive pieces (which are neighbours in the solved state) grouped 4 at a time on 3x3 and
+    # 3 at a time on larger boards, where a 4 piece table would take too long to build in Python
+    size  = 4 if side_length == 3 else 3
+    cells = side_length ** 2
+    return [ tuple(range(first, min(first + size, cells))) for first in range(1, cells, size) ]
+
+
+class PatternDatabase:
+
+    def __init__(self, side_length, patterns, tables):
+        self._side_length = side_length
+        self._patterns = [ tuple(pattern) for pattern in patterns ]
+        self._tables = tables
+        self._radices = [ [ (side_length ** 2) ** (len(pattern) - 1 - i) for i in range(len(pattern)) ] for pattern in self._patterns ]
+
+    @staticmethod
+    def cache_path(side_length, patterns, cache_dir = CACHE_DIR):
+        digest = hashlib.md5(repr([ tuple(pattern) for pattern in patterns ]).encode("ascii")).hexdigest()[:12]
+        return os.path.join(cache_dir, "puzzle{}_{}.pdb".format(side_length, digest))
+
+    @classmethod
+    def load(cls, side_length, goal, patterns = None, cache_dir = CACHE_DIR):
+
+        # goal lists the piece in every cell of the solved board (0 for the blank)
+        patterns = patterns or default_patterns(side_length)
+        path = PatternDatabase.cache_path(side_length, patterns, cache_dir)
+
+        if not os.path.exists(path):
+            tables = [ build_pattern_table(side_length, goal, pattern) for pattern in patterns ]
+            os.makedirs(cache_dir, exist_ok = True)
+            temporary_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(temporary_path, "wb") as f:
+                for table in tables:
+                    f.write(table.tobytes())
+            os.replace(temporary_path, path)
+
+        data = np.memmap(path, dtype = np.uint8, mode = "r")
+
+        tables, offset = [], 0
+        for pattern in patterns:
+            length = (side_length ** 2) ** len(pattern)
+            tables.append(data[offset:offset + length])
+            offset += length
+
+        if offset != len(data):
+            raise ValueError("{} does not match patterns {}".format(path, patterns))
+
+        return cls(side_length, patterns, tables)
+
+    def distance(self, cells):
+
+        # cells lists the piece in every cell of the board being scored
+        positions = [0] * len(cells)
+        for cell, piece in enumerate(cells):
+            positions[piece] = cell
+
+        return sum(
+            int(table[sum(positions[piece] * radix for piece, radix in zip(pattern, radices))])
+            for pattern, radices, table in zip(self._patterns, self._radices, self._tables)
+        )
+
+    def distances(self, boards):
+
+        # boards is a (board count, cells) array, one row per board; every table is read once for all of them
+        positions = np.argsort(boards, axis = 1)
+
+        total = np.zeros(len(boards), dtype = np.int64)
+        for pattern, radices, table in zip(self._patterns, self._radices, self._tables):
+            total += table[positions[:, list(pattern)] @ np.asarray(radices, dtype = np.int64)]
+        return total.tolist()
+
+
+def build_pattern_table(side_length, goal, pattern):
+
+    cells  = side_length ** 2
+    k      = len(pattern)
+    radices = [ cells ** (k - 1 - i) for i in range(k) ]
+
+    neighbors = []
+    for cell in range(cells):
+        y, x = divmod(cell, side_length)
+        neighbors.append([ (y + dy) * side_length + (x + dx) for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)) if 0 <= y + dy < side_length and 0 <= x + dx < side_length ])
+
+    goal = list(goal)
+    start_rank  = sum(goal.index(piece) * radix for piece, radix in zip(pattern, radices))
+    start_blank = goal.index(0)
+
+    # Abstract states are (rank of the pattern's positions, blank cell). Sliding a pattern piece
+    # costs one move and sliding any other piece is free, so this is a 0-1 breadth-first search.
+    distances = bytearray([UNREACHED]) * (cells ** k * cells)
+    distances[start_rank * cells + start_blank] = 0
+    queue = deque([ (start_rank, start_blank) ])
+
+    while queue:
+
+        rank, blank = queue.popleft()
+        distance = distances[rank * cells + blank]
+
+        positions = [ (rank // radix) % cells for radix in radices ]
+
+        for cell in neighbors[blank]:
+
+            if cell in positions:
+                # The pattern piece in that cell slides into the blank
+                child_rank = rank + (blank - cell) * radices[positions.index(cell)]
+                child_distance = distance + 1
+            else:
+                child_rank = rank
+                child_distance = distance
+
+            index = child_rank * cells + cell
+            if child_distance < distances[index]:
+                distances[index] = child_distance
+                if child_distance == distance:
+                    queue.appendleft((child_rank, cell))
+                else:
+                    queue.append((child_rank, cell))
+
+    # The heuristic doesn't know where the blank is, so take the best case over blank positions
+    return np.frombuffer(distances, dtype = np.uint8).reshape((cells ** k, cells)).min(axis = 1)
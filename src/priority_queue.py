@@ -0,0 +1,68 @@
+import heapq, itertools
+
+# A binary heap priority queue with lazy deletion: changing an item's priority pushes a new entry and marks the
+# old one stale. An index from item to live entry makes membership and priority lookups O(1).
+
+_REMOVED = object()
+
+
+class PriorityQueue:
+
+    def __init__(self):
+        self._heap    = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+    def push(self, item, priority):
+
+        # Adds the item, or replaces its priority if it is already queued
+        entry = self._entries.get(item)
+        if entry is not None:
+            entry[2] = _REMOVED
+
+        entry = [priority, next(self._counter), item]
+        self._entries[item] = entry
+        heapq.heappush(self._heap, entry)
+
+        # Don't let stale entries outnumber the live ones
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def pop(self):
+        return self.pop_with_priority()[0]
+
+    def pop_with_priority(self):
+        while self._heap:
+            priority, _, item = heapq.heappop(self._heap)
+            if item is not _REMOVED:
+                del self._entries[item]
+                return item, priority
+        raise IndexError("pop from an empty priority queue")
+
+    def peek_priority(self):
+        while self._heap and self._heap[0][2] is _REMOVED:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            raise IndexError("peek at an empty priority queue")
+        return self._heap[0][0]
+
+    def remove(self, item):
+        entry = self._entries.pop(item)
+        entry[2] = _REMOVED
+
+    def priority(self, item):
+        return self._entries[item][0]
+
+    def _compact(self):
+        self._heap = [ entry for entry in self._heap if entry[2] is not _REMOVED ]
+        heapq.heapify(self._heap)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        # Live items, in no particular order
+        return (entry[2] for entry in self._entries.values())
@@ -1,9 +1,8 @@
 import math, random, json, os
+from bisect import bisect_left
 from collections import namedtuple
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
-from graphviz import Digraph
+from pattern_database import PatternDatabase
 
 class PuzzleState:
 
@@ -11,10 +10,17 @@ class PuzzleState:
 
     SOLVED_STATES           = {}
     STRING_FORMAT_TEMPLATES = {}
+    NEIGHBORS               = {}
+    GOAL_POSITIONS          = {}
+    MANHATTAN_TABLES        = {}
+
+    # The board is packed into a single int, bits() per cell, with cell 0 (top left) in the lowest bits.
+    # Hashing and equality are int operations, and sliding a piece is two XORs because the blank is 0.
+    __slots__ = ("_packed", "_blank", "_size", "_graph", "backlink", "_string", "_cost", "_h")
 
     @staticmethod
     def get_string_format_template(side_length):
-        
+
         if side_length not in PuzzleState.STRING_FORMAT_TEMPLATES:
             n = max(map(len,map(str,range(1,side_length**2)))) + 2
             template_line = (("|{:^" + str(n) + "}") * side_length) + "|" + os.linesep
@@ -23,84 +29,284 @@ class PuzzleState:
             PuzzleState.STRING_FORMAT_TEMPLATES[side_length] = template
         return PuzzleState.STRING_FORMAT_TEMPLATES[side_length]
 
+    @staticmethod
+    def bits(side_length):
+        return max(4, (side_length ** 2 - 1).bit_length())
+
+    @staticmethod
+    def get_neighbors(side_length):
+
+        # For every blank position, the (move, position) of each piece that can slide into it
+        if side_length not in PuzzleState.NEIGHBORS:
+            neighbors = []
+            for blank in range(side_length ** 2):
+                y, x = divmod(blank, side_length)
+                pieces_around_empty_slot = []
+                if y > 0:
+                    pieces_around_empty_slot.append(("UP", blank - side_length))
+                if y < side_length - 1:
+                    pieces_around_empty_slot.append(("DOWN", blank + side_length))
+                if x > 0:
+                    pieces_around_empty_slot.append(("LEFT", blank - 1))
+                if x < side_length - 1:
+                    pieces_around_empty_slot.append(("RIGHT", blank + 1))
+                neighbors.append(pieces_around_empty_slot)
+            PuzzleState.NEIGHBORS[side_length] = neighbors
+        return PuzzleState.NEIGHBORS[side_length]
+
+    @staticmethod
+    def get_goal_positions(side_length):
+
+        # (row, column) of every piece in the solved state, indexed by piece. The blank has no entry.
+        if side_length not in PuzzleState.GOAL_POSITIONS:
+            goal_positions = [None] * (side_length ** 2)
+            for i, piece in enumerate(PuzzleGraph.get_solved_state(side_length).ravel().tolist()):
+                if piece != 0:
+                    goal_positions[piece] = divmod(i, side_length)
+            PuzzleState.GOAL_POSITIONS[side_length] = goal_positions
+        return PuzzleState.GOAL_POSITIONS[side_length]
+
+    @staticmethod
+    def get_manhattan_table(side_length):
+
+        # Manhattan distance of every piece from its goal, for every cell it could be in
+        if side_length not in PuzzleState.MANHATTAN_TABLES:
+            table = [[0] * (side_length ** 2)]
+            for goal_y, goal_x in PuzzleState.get_goal_positions(side_length)[1:]:
+                table.append([ abs(y - goal_y) + abs(x - goal_x) for y in range(side_length) for x in range(side_length) ])
+            PuzzleState.MANHATTAN_TABLES[side_length] = table
+        return PuzzleState.MANHATTAN_TABLES[side_length]
+
+    @staticmethod
+    def pack(state):
+        values = np.asarray(state).ravel().tolist()
+        bits   = PuzzleState.bits(len(state))
+        packed, blank = 0, None
+        for i, value in enumerate(values):
+            packed |= int(value) << (bits * i)
+            if value == 0:
+                blank = i
+        return packed, blank
+
+    @staticmethod
+    def unpack(packed, side_length):
+        bits = PuzzleState.bits(side_length)
+        mask = (1 << bits) - 1
+        return [ (packed >> (bits * i)) & mask for i in range(side_length ** 2) ]
+
     def __init__(self, state, graph, backlink = None):
-        self._state = state
-        self._size  = state.shape[0]
+        self._packed, self._blank = PuzzleState.pack(state)
+        self._size  = len(state)
         self._graph = graph
         self.backlink = backlink
         #self._add_to_graph_viz()
-        self.string = str(self)
-        self.cost = None
+        self._string = None
+        self._cost = None
+        self._h = None
+
+    @classmethod
+    def from_packed(cls, packed, blank, size, graph, backlink = None):
+        state = cls.__new__(cls)
+        state._packed = packed
+        state._blank  = blank
+        state._size   = size
+        state._graph  = graph
+        state.backlink = backlink
+        state._string = None
+        state._cost   = None
+        state._h      = None
+        return state
+
+    @property
+    def _state(self):
+        return np.asarray(PuzzleState.unpack(self._packed, self._size)).reshape((self._size, self._size))
+
+    @property
+    def string(self):
+        # Only built when the state is rendered
+        if self._string is None:
+            self._string = str(self)
+        return self._string
 
     def children(self):
+        return [ self.child(move) for move in self.moves() ]
+
+    def key(self):
+        # What identifies the board, as used by successors()
+        return self._packed
+
+    def successors(self):
+        # (key, move, cost) for every move, without building the child boards (see make_child)
+        for move in self.moves():
+            yield self._slide(move[1])[1], move, 1.0
+
+    def predecessors(self):
+        # Every slide can be reversed
+        return self.children()
+
+    def moves(self):
+        # Every piece around the empty slot can slide into it. A move is (name, position of the piece).
+        return PuzzleState.get_neighbors(self._size)[self._blank]
+
+    def _slide(self, position):
+        # Slide the piece: clear it from its cell and write it into the (zero) blank cell
+        bits  = PuzzleState.bits(self._size)
+        piece = (self._packed >> (bits * position)) & ((1 << bits) - 1)
+        return piece, self._packed ^ (piece << (bits * position)) ^ (piece << (bits * self._blank))
+
+    def child(self, move):
+        return self.make_child(self._slide(move[1])[1], move, 1.0)
+
+    def make_child(self, child_packed, move, cost):
+
+        name, position = move
+        bits  = PuzzleState.bits(self._size)
+        piece = (self._packed >> (bits * position)) & ((1 << bits) - 1)
+
+        # Create a link to the parent
+        backlink = PuzzleState.Backlink(name, self, cost)
+
+        child = PuzzleState.from_packed(child_packed, position, self._size, self._graph, backlink)
+
+        # Only one piece moved, so the child's heuristic is the parent's plus that piece's change
+        if self._h is not None and self._graph._pattern_database is None:
+            child._h = self._h + self._heuristic_delta(child_packed, name, piece, position)
+
+        return child
+
+    # In-place moves, for searches that walk a single board around instead of allocating children.
+    # apply() returns the move that puts the board back, so undo(apply(move)) is a no-op.
+    OPPOSITE_MOVES = { "UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT" }
 
-        children = []
-
-        # Find coordinates of zero entry
-        ((y,), (x,)) = (self._state == 0).nonzero()
-
-        # Get all piece positions around the empty slot
-        pieces_around_empty_slot = {
-            "UP": [y - 1, x    ], # UP
-            "DOWN": [y + 1, x    ], # DOWN
-            "LEFT": [y,     x - 1], # LEFT
-            "RIGHT": [y,     x + 1] # RIGHT
-        }
-
-        # 
-        for move, (_y,_x) in pieces_around_empty_slot.items():
-            
-            # Invalid piece position
-            if _y < 0 or _y >= self._size:
-                continue
-            
-            # Invalid piece position
-            if _x < 0 or _x >= self._size:
-                continue
-            
-            # Create a link to the parent
-            backlink = PuzzleState.Backlink(move, self, 1.0)  
-
-            # Slide the piece
-            child_state = np.copy(self._state)
-            child_state[y,  x] = child_state[_y, _x]
-            child_state[_y,_x] = 0          
-
-            # Valid piece to slide into the empty slot
-            children.append(PuzzleState(child_state, self._graph, backlink))
-
-        return children
+    def apply(self, move):
+
+        name, position = move
+        piece, packed = self._slide(position)
+
+        if self._h is not None and self._graph._pattern_database is None:
+            self._h += self._heuristic_delta(packed, name, piece, position)
+        else:
+            self._h = None
+
+        undo = (PuzzleState.OPPOSITE_MOVES[name], self._blank)
+
+        self._packed, self._blank = packed, position
+        self._string = None
+        self._cost = None
+
+        return undo
+
+    def undo(self, move):
+        self.apply(move)
 
     def shuffle(self, n = 50):
         x = self
         for i in range(n):
             x = random.choice(x.children())
             x.backlink = None
-        self._state = np.copy(x._state)
-        self._size = self._state.shape[0]
+        self._packed = x._packed
+        self._blank  = x._blank
         self.backlink = None
-        self.string = str(self)
+        self._string = None
+        self._cost = None
+        self._h = None
 
     def is_goal(self):
-        return np.array_equal(self._state, self._graph._goal._state)
+        return self._packed == self._graph._goal._packed
 
     def distance(self):
+        if self._h is None:
+            if self._graph._pattern_database is not None:
+                self._h = self._graph._pattern_database.distance(PuzzleState.unpack(self._packed, self._size))
+            else:
+                self._h = self.manhattan_distance()
+                if self._graph._linear_conflict:
+                    self._h += self.linear_conflicts()
+        return self._h
+
+    @staticmethod
+    def batch_distance(states):
+
+        # Incremental heuristics are already known for children; pattern database lookups are done for all the boards together
+        unscored = [ state for state in states if state._h is None ]
+        pattern_database = unscored[0]._graph._pattern_database if unscored else None
+        if pattern_database is not None:
+            boards = np.array([ PuzzleState.unpack(state._packed, state._size) for state in unscored ])
+            for state, h in zip(unscored, pattern_database.distances(boards)):
+                state._h = h
+        return [ state.distance() for state in states ]
+
+    def distance_to(self, other):
+
+        # Manhattan distance to an arbitrary board rather than the goal
+        positions = [0] * (self._size ** 2)
+        for cell, piece in enumerate(PuzzleState.unpack(other._packed, self._size)):
+            positions[piece] = cell
+
         cost = 0
-        for y in range(self._size):
-            for x in range(self._size):
-                value = self._state[y,x]
-                if value == 0:
-                    flat_index = self._size ** 2 // 2
-                elif value <= self._size ** 2 // 2:
-                    flat_index = value - 1
-                else:
-                    flat_index = value
-                solved_y = flat_index // self._size
-                solved_x = flat_index %  self._size
-                this_cost = abs(y - solved_y) + abs(x - solved_x)
-                cost += this_cost
+        for cell, piece in enumerate(PuzzleState.unpack(self._packed, self._size)):
+            if piece != 0:
+                y, x = divmod(cell, self._size)
+                other_y, other_x = divmod(positions[piece], self._size)
+                cost += abs(y - other_y) + abs(x - other_x)
         return cost
 
+    def manhattan_distance(self):
+        table = PuzzleState.get_manhattan_table(self._size)
+        return sum(table[piece][cell] for cell, piece in enumerate(PuzzleState.unpack(self._packed, self._size)))
+
+    def linear_conflicts(self):
+        return sum(PuzzleState.line_conflicts(self._packed, self._size, line, True) + PuzzleState.line_conflicts(self._packed, self._size, line, False) for line in range(self._size))
+
+    @staticmethod
+    def line_conflicts(packed, size, line, is_row):
+
+        # Pieces that are in their goal row (column) but in the wrong order relative to each other
+        # each need at least two extra moves to get past one another. The fewest pieces that have to
+        # step out of the line are those not on a longest increasing run of goal columns (rows).
+        bits = PuzzleState.bits(size)
+        mask = (1 << bits) - 1
+        goal_positions = PuzzleState.get_goal_positions(size)
+
+        cells = range(line * size, (line + 1) * size) if is_row else range(line, size ** 2, size)
+
+        goals = []
+        for cell in cells:
+            piece = (packed >> (bits * cell)) & mask
+            if piece != 0:
+                goal_y, goal_x = goal_positions[piece]
+                if is_row and goal_y == line:
+                    goals.append(goal_x)
+                elif not is_row and goal_x == line:
+                    goals.append(goal_y)
+
+        if len(goals) < 2:
+            return 0
+
+        increasing = []
+        for goal in goals:
+            i = bisect_left(increasing, goal)
+            if i == len(increasing):
+                increasing.append(goal)
+            else:
+                increasing[i] = goal
+
+        return 2 * (len(goals) - len(increasing))
+
+    def _heuristic_delta(self, child_packed, move, piece, position):
+
+        table = PuzzleState.get_manhattan_table(self._size)
+        delta = table[piece][self._blank] - table[piece][position]
+
+        # A piece sliding up or down changes the pieces in two rows but not the order within its column (and vice versa)
+        if self._graph._linear_conflict:
+            is_row = move in ("UP", "DOWN")
+            lines = { cell // self._size if is_row else cell % self._size for cell in (self._blank, position) }
+            for line in lines:
+                delta += PuzzleState.line_conflicts(child_packed, self._size, line, is_row) - PuzzleState.line_conflicts(self._packed, self._size, line, is_row)
+
+        return delta
+
     def path(self):
         path = []
         x = self
@@ -112,35 +318,34 @@ class PuzzleState:
         return path
 
     def cost(self):
-        if self.cost is None:
+        if self._cost is None:
             cost = 0
             x = self
             while x.backlink is not None:
-                x = x.backlink.parent
                 cost += x.backlink.cost
-            self.cost = cost
-        return self.cost
+                x = x.backlink.parent
+            self._cost = cost
+        return self._cost
 
     def copy(self):
-        return PuzzleState(np.copy(self._state), self._graph)
+        return PuzzleState.from_packed(self._packed, self._blank, self._size, self._graph)
 
     def is_root(self):
         return self.backlink is None
 
     # value comparison only
     def __eq__(self, other):
-        return isinstance(other, self.__class__) and np.array_equal(self._state, other._state)
+        return isinstance(other, self.__class__) and self._packed == other._packed and self._size == other._size
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        # TODO: more efficient hashing
-        return hash(self._state.data.tobytes())
+        return hash(self._packed)
 
     def __str__(self):
         string_format = PuzzleState.get_string_format_template(self._size)
-        return string_format.format(*[ x or " " for x in self._state.ravel() ])
+        return string_format.format(*[ x or " " for x in PuzzleState.unpack(self._packed, self._size) ])
 
 
 
@@ -151,18 +356,30 @@ class PuzzleGraph:
     BLANK    = 0
     SOLVED_STATES = {}
 
-    def __init__(self, side_length):
+    HEURISTICS = ("manhattan", "linear_conflict", "pdb")
+
+    def __init__(self, side_length, heuristic = "manhattan", start = None, patterns = None):
         assert side_length % 2 == 1
+        assert heuristic in PuzzleGraph.HEURISTICS
 
         self._graphviz = None
+        self._linear_conflict = heuristic == "linear_conflict"
 
         goal_state = PuzzleGraph.get_solved_state(side_length)
         self._goal = PuzzleState(goal_state, self)
 
-        self._start = PuzzleState(np.asarray([ [2, 3, 0], [1, 4, 5], [7, 8, 6] ]), self, None)
+        # Pattern databases are built on first use and memory-mapped from the cache afterwards
+        self._pattern_database = None
+        if heuristic == "pdb":
+            self._pattern_database = PatternDatabase.load(side_length, goal_state.ravel().tolist(), patterns)
 
-        self._graphviz = Digraph(format = "svg")
-        self._graphviz.graph_attr.update(rank='min')
+        if start is not None:
+            self._start = PuzzleState(np.asarray(start), self, None)
+        elif side_length == 3:
+            self._start = PuzzleState(np.asarray([ [2, 3, 0], [1, 4, 5], [7, 8, 6] ]), self, None)
+        else:
+            self._start = self._goal.copy()
+            self._start.shuffle(side_length ** 3)
 
         self.rendered_nodes = set()
         self.rendered_edges = set()
@@ -171,8 +388,16 @@ class PuzzleGraph:
     def start_node(self):
         return self._start
 
+    def goal_node(self):
+        return self._goal.copy()
+
     def init_viz(self):
-        pass
+
+        # Imported here so that headless solves never pay for graphviz
+        from graphviz import Digraph
+
+        self._graphviz = Digraph(format = "svg")
+        self._graphviz.graph_attr.update(rank='min')
 
     def redraw(self, queued, visited, current, path, snapshot):
 
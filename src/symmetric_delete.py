@@ -0,0 +1,296 @@
+import os, sys, hashlib
+from array import array
+import numpy as np
+from english import english_words, LEXICON_PATH
+from autocorrect import String
+
+# Symmetric delete spelling correction (as in SymSpell): strings within k edits share a string made by deleting up
+# to k characters from each, so only words sharing one of the query's deletions need checking.
+
+# Layout (little endian): a HEADER, the sorted uint64 blake2b hashes of the deletions, uint32 starts[key count + 1]
+# into the postings, then the uint32 word numbers (lexicon positions) of each hash's words
+# The header's lexicon is the fingerprint of the compiled lexicon the word numbers refer to, if it was built from one.
+MAGIC = b"COTBSYM2"
+HEADER = np.dtype([ ("magic", "S8"), ("max_edits", "<u4"), ("word_count", "<u4"), ("key_count", "<u8"), ("posting_count", "<u8"), ("lexicon", "S32") ])
+
+MAX_EDITS = 2
+
+INDEX_PATH = os.environ.get("COTB_SYMMETRIC_DELETE", os.path.splitext(LEXICON_PATH)[0] + ".symdelete")
+
+
+def variant_hash(string):
+    return int.from_bytes(hashlib.blake2b(string.encode("latin-1", errors = "replace"), digest_size = 8).digest(), "little")
+
+
+def deletes(string, max_edits):
+    # The string and every string made by deleting up to max_edits of its characters
+    variants, layer = { string }, { string }
+    for i in range(max_edits):
+        layer = { variant[:j] + variant[j+1:] for variant in layer for j in range(len(variant)) }
+        variants |= layer
+    return variants
+
+
+def write_symmetric_delete_index(words, path, max_edits = MAX_EDITS):
+
+    # words in lexicon order, as their positions are what the postings store
+    hashes, numbers = array("Q"), array("I")
+    word_count = 0
+    for number, word in enumerate(words):
+        for variant in deletes(word, max_edits):
+            hashes.append(variant_hash(variant))
+            numbers.append(number)
+        word_count += 1
+
+    hashes  = np.frombuffer(hashes, dtype = np.uint64)
+    numbers = np.frombuffer(numbers, dtype = np.uint32)
+    order   = np.lexsort((numbers, hashes))
+    hashes, postings = hashes[order], numbers[order]
+
+    keys, starts = np.unique(hashes, return_index = True)
+    starts = np.append(starts, len(postings))
+
+    header = np.zeros(1, dtype = HEADER)
+    header["magic"], header["max_edits"], header["word_count"] = MAGIC, max_edits, word_count
+    header["key_count"], header["posting_count"] = len(keys), len(postings)
+    if hasattr(words, "fingerprint"):
+        header["lexicon"] = words.fingerprint().encode("ascii")
+
+    # Write to a temporary file and rename, so a concurrently starting process never maps a half written index
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(keys.astype("<u8").tobytes())
+        f.write(starts.astype("<u4").tobytes())
+        f.write(postings.astype("<u4").tobytes())
+    os.replace(temporary_path, path)
+
+
+def edit_script(string, word, max_edits, allowed_transitions = "idt"):
+
+    # Fewest inserts, deletes and transpositions of neighbours turning string into word, applied one after another
+    # as a search over StringGraph applies them (no substitutions, as StringGraph has none), and the moves that do it,
+    # or None if it takes more than max_edits. The moves are in String.successors() form and in the order they apply.
+    n, m = len(string), len(word)
+    if abs(n - m) > max_edits:
+        return None
+
+    # Transpositions without inserts or deletes can move a letter further than the table can follow
+    if "t" in allowed_transitions and not ("i" in allowed_transitions and "d" in allowed_transitions):
+        return _searched_edit_script(string, word, max_edits, allowed_transitions)
+
+    d = _edit_table(string, word, max_edits, allowed_transitions)
+    if d[n][m] > max_edits:
+        return None
+
+    # Walk back from the end, so each move's position is still valid after the ones before it (which are all
+    # further right) have been applied; inserted letters are upper case, like the ones String inserts
+    moves, i, j = [], n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and string[i-1] == word[j-1] and d[i][j] == d[i-1][j-1]:
+            i, j = i - 1, j - 1
+            continue
+        transposition = _transposition(string, word, i, j, allowed_transitions) if i > 0 and j > 0 and string[i-1] != word[j-1] else None
+        if transposition is not None and d[i][j] == d[transposition[0]-1][transposition[1]-1] + transposition[2]:
+            # Delete the string's letters between the pair, swap it, and insert the word's letters in between
+            k, l, cost = transposition
+            moves.extend(("delete", p) for p in range(i - 2, k - 1, -1))
+            moves.append(("transpose", k - 1))
+            moves.extend(("insert", k, word[p].upper()) for p in range(j - 2, l - 1, -1))
+            i, j = k - 1, l - 1
+        elif i > 0 and "d" in allowed_transitions and d[i][j] == d[i-1][j] + 1:
+            moves.append(("delete", i - 1))
+            i -= 1
+        else:
+            moves.append(("insert", i, word[j-1].upper()))
+            j -= 1
+
+    return moves
+
+
+def _transposition(string, word, i, j, allowed_transitions):
+
+    # The Lowrance-Wagner transposition ending at string[i-1] and word[j-1]: string[k-1] and string[i-1] swap places to
+    # become word[j-1] and word[l-1], with the string's letters between them deleted and the word's inserted.
+    # (k, l, cost), or None if there is no such pair or it needs edits that aren't allowed.
+    if i < 2 or j < 2 or "t" not in allowed_transitions:
+        return None
+    k = string.rfind(word[j-1], 0, i - 1) + 1
+    l = word.rfind(string[i-1], 0, j - 1) + 1
+    if k == 0 or l == 0:
+        return None
+    deleted, inserted = i - k - 1, j - l - 1
+    if (deleted and "d" not in allowed_transitions) or (inserted and "i" not in allowed_transitions):
+        return None
+    return k, l, deleted + 1 + inserted
+
+
+def _edit_table(string, word, max_edits, allowed_transitions):
+
+    # d[i][j] is the fewest edits turning string[:i] into word[:j], clamped to max_edits + 1
+    n, m = len(string), len(word)
+    inf = max_edits + 1
+    d = [ [ inf ] * (m + 1) for i in range(n + 1) ]
+    d[0][0] = 0
+    for i in range(n + 1):
+        for j in range(m + 1):
+            if i == 0 and j == 0:
+                continue
+            best = inf
+            if i > 0 and j > 0 and string[i-1] == word[j-1]:
+                # Swapping a letter with a copy of itself never beats matching them
+                best = d[i-1][j-1]
+            else:
+                transposition = _transposition(string, word, i, j, allowed_transitions)
+                if transposition is not None:
+                    k, l, cost = transposition
+                    best = d[k-1][l-1] + cost
+            if i > 0 and "d" in allowed_transitions and d[i-1][j] + 1 < best:
+                best = d[i-1][j] + 1
+            if j > 0 and "i" in allowed_transitions and d[i][j-1] + 1 < best:
+                best = d[i][j-1] + 1
+            d[i][j] = min(best, inf)
+    return d
+
+
+def _searched_edit_script(string, word, max_edits, allowed_transitions):
+
+    # Iterative deepening over the edits themselves, pruned by the table with all three edits allowed (which never
+    # needs more edits than fewer kinds of edit do). Only letters of the word are worth inserting, as without
+    # deletes an inserted letter can't be taken out again.
+    def lower_bound(string):
+        if ("i" not in allowed_transitions and len(string) < len(word)) or ("d" not in allowed_transitions and len(string) > len(word)):
+            return max_edits + 1
+        return _edit_table(string, word, max_edits, "idt")[-1][-1]
+
+    def edits(string):
+        if "i" in allowed_transitions:
+            for i in range(len(string) + 1):
+                for letter in set(word):
+                    yield ("insert", i, letter.upper())
+        if "t" in allowed_transitions:
+            for i in range(len(string) - 1):
+                if string[i] != string[i+1]:
+                    yield ("transpose", i)
+        if "d" in allowed_transitions:
+            for i in range(len(string)):
+                yield ("delete", i)
+
+    def search(string, budget):
+        if string == word:
+            return []
+        for move in edits(string):
+            child = String.edit(string, move).lower()
+            if lower_bound(child) <= budget - 1:
+                moves = search(child, budget - 1)
+                if moves is not None:
+                    return [ move ] + moves
+        return None
+
+    for budget in range(lower_bound(string), max_edits + 1):
+        moves = search(string, budget)
+        if moves is not None:
+            return moves
+    return None
+
+
+class SymmetricDeleteIndex:
+
+    def __init__(self, path, words = None):
+
+        header = np.fromfile(path, dtype = HEADER, count = 1)
+        if len(header) == 0 or header["magic"][0] != MAGIC:
+            raise ValueError("{} is not a symmetric delete index".format(path))
+        self.max_edits = int(header["max_edits"][0])
+        key_count, posting_count = int(header["key_count"][0]), int(header["posting_count"][0])
+
+        # Mapped read-only, so every process that opens the same file shares the same pages
+        data = np.memmap(path, dtype = np.uint8, mode = "r")
+        position = HEADER.itemsize
+        self._keys = data[position:position + 8 * key_count].view("<u8")
+        position += 8 * key_count
+        self._starts = data[position:position + 4 * (key_count + 1)].view("<u4")
+        position += 4 * (key_count + 1)
+        self._postings = data[position:position + 4 * posting_count].view("<u4")
+
+        # Word numbers are only meaningful for the word list the index was built from
+        self._words = english_words() if words is None else words
+        lexicon = header["lexicon"][0].decode("ascii")
+        if len(self._words) != int(header["word_count"][0]) or (lexicon and hasattr(self._words, "fingerprint") and lexicon != self._words.fingerprint()):
+            raise ValueError("{} was built for a different word list".format(path))
+
+    def candidates(self, string, max_edits = None):
+
+        # Numbers of the words that share a deletion variant with the string, in lexicon order
+        max_edits = self.max_edits if max_edits is None else min(max_edits, self.max_edits)
+        hashes = np.array([ variant_hash(variant) for variant in deletes(string, max_edits) ], dtype = np.uint64)
+
+        positions = np.minimum(np.searchsorted(self._keys, hashes), len(self._keys) - 1)
+        positions = positions[self._keys[positions] == hashes]
+        if len(positions) == 0:
+            return []
+
+        return np.unique(np.concatenate([ self._postings[self._starts[p]:self._starts[p + 1]] for p in positions.tolist() ])).tolist()
+
+    def correct(self, string, max_edits = None, allowed_transitions = "idt"):
+
+        # (word, moves) for the nearest word, the first in lexicon order among equally near ones, or None
+        max_edits = self.max_edits if max_edits is None else min(max_edits, self.max_edits)
+        query = string.lower()
+
+        best = None
+        for number in self.candidates(query, max_edits):
+            word = self._words.word(number)
+            moves = edit_script(query, word, max_edits if best is None else len(best[1]) - 1, allowed_transitions)
+            if moves is not None:
+                best = (word, moves)
+                if not moves:
+                    break
+
+        return best
+
+    def autocorrect(self, start, max_edits = None):
+
+        # The corrected String, reached from start by a chain of children so that path() and the backlink
+        # edit descriptions look just like a search's result, or None if no word is close enough
+        correction = self.correct(start.string, max_edits, start.graph.allowed_transitions)
+        if correction is None:
+            return None
+
+        node = start
+        for move in correction[1]:
+            node = node.make_child(String.edit(node.string, move), move, 1.0)
+        return node
+
+
+_index = None
+
+def symmetric_delete_index():
+    global _index
+    if _index is None:
+        try:
+            _index = SymmetricDeleteIndex(INDEX_PATH)
+        except (FileNotFoundError, ValueError):
+            # Not built yet, from an older version, or built before the lexicon was rebuilt
+            write_symmetric_delete_index(english_words(), INDEX_PATH)
+            _index = SymmetricDeleteIndex(INDEX_PATH)
+    return _index
+
+
+def symmetric_delete_search(start):
+
+    # Follows the algorithm coroutine protocol, so it can stand in for a search over a StringGraph
+    if (yield) == -1:
+        return
+
+    # The graph's edit budget, if it has one, bounds the correction as it bounds a search
+    goal = symmetric_delete_index().autocorrect(start, start.graph.max_edits)
+    if goal is not None:
+        # Coroutine hack to communicate algorithm state back to viz
+        yield goal, [ node for node in goal.path() ], []
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else INDEX_PATH
+    write_symmetric_delete_index(english_words(), path)
+    print("Indexed", len(english_words()), "words to", path)
@@ -0,0 +1,26 @@
+from batch_autocorrect import autocorrect_batch, correct
+
+if __name__ == "__main__":
+
+    strings = [ "brithdya", "speling", "brithdya", "teh", "xqzvwkpl", "speling" ]
+
+    # In input order, duplicates included, and the same answers as solving each string on its own
+    results = list(autocorrect_batch(strings, max_edits = 2, processes = 2))
+    assert [ result.string for result in results ] == strings
+    assert results == [ correct(string, max_edits = 2) for string in strings ]
+    assert results[0].correction.lower() == "birthday" and results[4].correction is None and not results[4].timed_out
+
+    # A search that can't finish in time reports it rather than holding up the batch
+    results = list(autocorrect_batch([ "acomodate", "teh" ], algorithm = "breadthfirst", timeout = 0.01, processes = 2))
+    assert results[0].timed_out and results[0].correction is None
+
+    # The edit budget holds for the index lookup too, and searches that can't correct strings are turned away up front
+    assert correct("brithdya", algorithm = "symdelete", max_edits = 1).correction is None
+    assert correct("brithdya", algorithm = "symdelete", max_edits = 2).correction == "birthday"
+    try:
+        list(autocorrect_batch(strings, algorithm = "jps"))
+        assert False
+    except ValueError:
+        pass
+
+    print("ok")
@@ -0,0 +1,19 @@
+import random
+from english import letters, word_list, string_distance, smallest_distance_to_any_english_word, smallest_distances_to_any_english_word, english_words_within
+
+random.seed(0)
+queries = [ "brithdya", "birthday", "", "a", "zzzzzzzzzzzz" ]
+for i in range(50):
+    queries.append("".join(random.choice(letters.lower()) for _ in range(random.randint(1, 10))))
+
+for query in queries:
+    expected = min(string_distance(query, word) for word in word_list)
+    assert smallest_distance_to_any_english_word(query) == expected, query
+
+    within = english_words_within(query, expected + 1)
+    assert sorted(word for _, word in within) == sorted(word for word in word_list if string_distance(query, word) <= expected + 1), query
+
+# The batched kernel must agree with the one-at-a-time answers
+assert smallest_distances_to_any_english_word(queries) == [ smallest_distance_to_any_english_word(query) for query in queries ]
+assert [ distance for distance, _ in english_words_within("brithdya", 3) ] == sorted(distance for distance, _ in english_words_within("brithdya", 3))
+print("Lexicon agrees with the linear scan on", len(queries), "queries")
@@ -0,0 +1,198 @@
+import os, random, tempfile
+import numpy as np
+from grid import Grid, GridNode, DIRECTIONS
+from grid_search import grid_search, distance_field, MODES
+from a_star_search import a_star_search
+from d_star_lite import DStarLite
+from hierarchical import Abstraction
+from uniform_cost_search import uniform_cost_search
+from jump_point_search import jump_point_path
+from breadth_first_search import breadth_first_search
+
+def random_grid(Y, X, n_obstacles):
+    obstacles = []
+    for i in range(n_obstacles):
+        y1 = random.randint(0, Y - 1); y2 = random.randint(y1, min(Y, y1 + Y // 3 + 1))
+        x1 = random.randint(0, X - 1); x2 = random.randint(x1, min(X, x1 + X // 3 + 1))
+        obstacles.append((y1, y2, x1, x2))
+    return obstacles
+
+random.seed(0)
+
+# The rasterized obstacles agree with testing every rectangle
+for i in range(10):
+    Y, X = random.randint(1, 20), random.randint(1, 20)
+    obstacles = random_grid(Y, X, random.randint(0, 6))
+    grid = Grid((Y, X), obstacles, (0, 0), (Y - 1, X - 1))
+
+    def has_position(y, x):
+        return 0 <= y < Y and 0 <= x < X and not any(y1 <= y < y2 and x1 <= x < x2 for (y1, y2, x1, x2) in obstacles)
+
+    for y in range(-2, Y + 2):
+        for x in range(-2, X + 2):
+            assert grid._has_position((y, x)) == has_position(y, x)
+
+    for y in range(Y):
+        for x in range(X):
+            children = [ (child.backlink.direction, child.pos()) for child in GridNode(grid, (y, x)).children() ]
+            assert children == [ (direction, (y + dy, x + dx)) for direction, dy, dx in DIRECTIONS if has_position(y + dy, x + dx) ]
+
+def solve(algorithm, start):
+    algorithm = algorithm(start)
+    next(algorithm)
+    for node, visited, queue in algorithm:
+        if node.is_goal():
+            return node
+
+# The array-backed engine and jump point search find paths as short as breadth-first search over GridNodes (every move costs 1)
+for i in range(10):
+    obstacles = random_grid(20, 30, 8)
+    grid = Grid((20, 30), obstacles, (0, 0), (19, 29))
+    if not grid._has_position(grid._start) or not grid._has_position(grid._goal):
+        continue
+    expected = solve(breadth_first_search, grid.start_node())
+    for node in [ grid_search(grid, mode = mode) for mode in MODES ] + [ jump_point_path(grid) ]:
+        assert (node is None) == (expected is None)
+        if node is not None:
+            path = node.path()
+            assert len(path) == len(expected.path())
+            assert path[0].is_goal() and path[-1].pos() == grid._start
+            assert all(a in b.children() for a, b in zip(path, path[1:]))
+
+# ALT bounds never exceed the true distance, and A* guided by them still finds shortest paths
+for i in range(5):
+    obstacles = random_grid(20, 30, 8)
+    grid = Grid((20, 30), obstacles, (0, 0), (19, 29), heuristic = "alt", landmark_count = 4)
+    if not grid._has_position(grid._start) or not grid._has_position(grid._goal):
+        continue
+    field = distance_field(grid, grid._goal)
+    for y in range(20):
+        for x in range(30):
+            if grid._has_position((y, x)):
+                assert grid.estimate((y, x), grid._goal) <= field[y, x]
+    expected = grid_search(grid, mode = "dijkstra")
+    for node in [ grid_search(grid), jump_point_path(grid), solve(a_star_search, grid.start_node()) ]:
+        assert (node is None) == (expected is None)
+        if node is not None:
+            assert len(node.path()) == len(expected.path())
+
+# Distance field queries match Dijkstra, fields are evicted least recently used first, and go stale when obstacles change
+grid = Grid((20, 30), [(0, 15, 10, 12)], (0, 0), (0, 29))
+fields = grid.distance_fields(maxsize = 2)
+for start in [ (0, 0), (19, 0), (5, 20), (0, 29) ]:
+    expected = grid_search(grid, start = start, mode = "dijkstra")
+    node = fields.path(start)
+    assert len(node.path()) == len(expected.path()) and node.path()[-1].pos() == start and node.is_goal()
+    assert all(a in b.children() for a, b in zip(node.path(), node.path()[1:]))
+assert fields.misses == 1 and fields.hits == 3
+fields.field((19, 29)); fields.field((10, 0)); fields.field((0, 29))
+assert len(fields) == 2 and (0, 29) in fields and (19, 29) not in fields
+grid.add_obstacle((15, 20, 10, 12))
+assert (0, 29) not in fields and fields.path((0, 0)) is None
+grid.remove_obstacle((15, 20, 10, 12))
+assert len(fields.path((0, 0)).path()) == len(grid_search(grid, start = (0, 0)).path())
+
+# Obstacles given as a tuple of lists can still be added to and removed
+tupled = Grid((10, 10), obstacles = ([ 2, 4, 2, 4 ],), start = (0, 0), goal = (9, 9))
+tupled.add_obstacle((6, 8, 6, 8))
+tupled.remove_obstacle([ 2, 4, 2, 4 ])
+assert tupled._obstacles == [ (6, 8, 6, 8) ]
+
+# A Moving AI map loads into the same passability as the equivalent rectangles, mapped from its compiled file
+rows = [ "." * 30 ] * 20
+rows = [ row[:10] + "@@" + row[12:] if y < 15 else row for y, row in enumerate(rows) ]
+rows[19] = "T" + rows[19][1:]
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "test.map")
+    with open(path, "w") as f:
+        f.write("type octile\nheight 20\nwidth 30\nmap\n" + "\n".join(rows) + "\n")
+    mapped = Grid.from_map(path, (0, 0), (0, 29))
+    expected = Grid((20, 30), [(0, 15, 10, 12), (19, 20, 0, 1)], (0, 0), (0, 29))
+    assert isinstance(mapped._passable.base, np.memmap) or isinstance(mapped._passable, np.memmap)
+    assert (mapped._passable == expected._passable).all() and (mapped._neighbor_masks == expected._neighbor_masks).all()
+    assert len(grid_search(mapped).path()) == len(grid_search(expected).path())
+    mapped.add_obstacle((15, 20, 10, 12))
+    assert grid_search(mapped) is None
+    del mapped
+
+# D* Lite replans to the same lengths as a fresh search as obstacles are added and removed and the start moves
+for i in range(5):
+    grid = Grid((20, 30), random_grid(20, 30, 5), (0, 0), (19, 29))
+    if not grid._has_position(grid._start) or not grid._has_position(grid._goal):
+        continue
+    planner = DStarLite(grid)
+    for step in range(6):
+        if step % 2 == 0:
+            obstacle = random_grid(20, 30, 1)[0]
+            grid.add_obstacle(obstacle)
+        else:
+            grid.remove_obstacle(obstacle)
+        if step == 3:
+            node = planner.plan()
+            if node is not None and len(node.path()) > 2:
+                start = node.path()[-3].pos()
+                planner.move_to(start)
+                grid._start = start
+        node, expected = planner.plan(), grid_search(grid, mode = "dijkstra") if grid._has_position(grid._start) else None
+        assert (node is None) == (expected is None)
+        if node is not None:
+            path = node.path()
+            assert len(path) == len(expected.path()) and path[-1].pos() == grid._start
+            assert all(a in b.children() for a, b in zip(path, path[1:]))
+    planner.close()
+    assert grid._listeners == []
+
+# HPA* finds valid paths exactly when a path exists, no shorter than the shortest, and keeps up with obstacle changes and a save / load
+def check_hierarchical(abstraction, grid, start, goal):
+    node, expected = abstraction.path(start, goal), grid_search(grid, start, goal)
+    assert (node is None) == (expected is None)
+    if node is not None:
+        path = node.path()
+        assert path[0].pos() == goal and path[-1].pos() == start and len(path) >= len(expected.path())
+        assert all(a in b.children() for a, b in zip(path, path[1:]))
+
+for i in range(3):
+    grid = Grid((40, 60), random_grid(40, 60, 12), (0, 0), (39, 59))
+    abstraction = Abstraction.build(grid, cluster_size = 8)
+    cells = [ (random.randrange(40), random.randrange(60)) for j in range(20) ]
+    for start, goal in zip(cells, cells[1:]):
+        check_hierarchical(abstraction, grid, start, goal)
+    grid.add_obstacle(random_grid(40, 60, 1)[0])
+    with tempfile.TemporaryDirectory() as directory:
+        abstraction.save(os.path.join(directory, "test.hpa"))
+        abstraction.close()
+        abstraction = Abstraction.load(grid, os.path.join(directory, "test.hpa"))
+    for start, goal in zip(cells, cells[1:]):
+        check_hierarchical(abstraction, grid, start, goal)
+
+# On weighted terrain, every cost-aware search agrees with uniform cost search over GridNodes on the cheapest cost
+for i in range(5):
+    terrain = np.random.RandomState(i).uniform(0.5, 4.0, (15, 20))
+    grid = Grid((15, 20), random_grid(15, 20, 4), (0, 0), (14, 19), heuristic = "octile", terrain = terrain)
+    if not grid._has_position(grid._start) or not grid._has_position(grid._goal):
+        continue
+    expected = solve(uniform_cost_search, grid.start_node())
+    nodes = [ grid_search(grid, mode = "astar"), grid_search(grid, mode = "dijkstra"), solve(a_star_search, grid.start_node()),
+              grid.distance_fields().path(), DStarLite(grid).plan() ]
+    for node in nodes:
+        assert (node is None) == (expected is None)
+        if node is not None:
+            assert abs(node.cost() - expected.cost()) < 1e-3
+            assert abs(node.cost() - sum(a.backlink.cost for a in node.path()[:-1])) < 1e-9
+    hierarchical = Abstraction.build(grid, cluster_size = 5).path()
+    assert (hierarchical is None) == (expected is None)
+    assert hierarchical is None or hierarchical.cost() >= expected.cost() - 1e-3
+    try:
+        jump_point_path(grid)
+        assert False
+    except ValueError:
+        pass
+
+# Lazy successors describe exactly the children, and make_child builds the same nodes
+grid = Grid((20, 30), [(0, 15, 10, 12)], (0, 0), (0, 29), terrain = np.random.RandomState(0).uniform(1.0, 2.0, (20, 30)))
+for node in [ GridNode(grid, (y, x)) for y in range(0, 20, 3) for x in range(0, 30, 4) ]:
+    children = node.children()
+    assert [ (child.key(), child.backlink.direction, child.backlink.cost) for child in children ] == list(node.successors())
+    assert [ node.make_child(*successor) for successor in node.successors() ] == children
+
+print("ok")
@@ -0,0 +1,33 @@
+import os, tempfile
+from memoize import LRUCache
+
+cache = LRUCache(maxsize = 3)
+for key in "abc":
+    cache[key] = key.upper()
+assert cache.get("a") == "A"
+
+# b is now the least recently used, so it goes first
+cache["d"] = "D"
+assert "b" not in cache and len(cache) == 3
+assert cache.get("b") is None and cache.get("b", 0) == 0
+assert (cache.hits, cache.misses) == (1, 2) and abs(cache.hit_rate() - 1 / 3) < 1e-9
+
+cache.resize(2)
+assert "c" not in cache and "a" in cache and "d" in cache
+
+# Saved entries come back as the least recently used, behind anything already cached
+with tempfile.TemporaryDirectory() as directory:
+    cache.save(os.path.join(directory, "test.cache"))
+    warm = LRUCache(maxsize = 2)
+    warm["e"] = "E"
+    warm.load(os.path.join(directory, "test.cache"))
+    assert len(warm) == 2 and "e" in warm and "d" in warm and warm.get("a") is None
+
+    # A cache saved against something else is ignored
+    cache.save(os.path.join(directory, "tagged.cache"), fingerprint = "lexicon 1")
+    assert not warm.load(os.path.join(directory, "tagged.cache"), fingerprint = "lexicon 2")
+    assert warm.load(os.path.join(directory, "tagged.cache"), fingerprint = "lexicon 1")
+
+cache.clear()
+assert len(cache) == 0 and cache.hits == cache.misses == 0
+print("ok")
@@ -0,0 +1,50 @@
+import random
+from priority_queue import PriorityQueue
+
+q = PriorityQueue()
+q.push("a", 3)
+q.push("b", 1)
+q.push("c", 2)
+assert len(q) == 3
+assert "b" in q and "d" not in q
+assert q.priority("a") == 3
+
+# Decrease-key
+q.push("a", 0)
+assert len(q) == 3
+assert q.peek_priority() == 0
+assert q.pop_with_priority() == ("a", 0)
+
+# Increase-key
+q.push("b", 5)
+assert [ q.pop() for _ in range(len(q)) ] == ["c", "b"]
+assert len(q) == 0 and list(q) == []
+
+# Ties come out in insertion order
+for item in "xyz":
+    q.push(item, 1)
+q.remove("y")
+assert sorted(q) == ["x", "z"]
+assert q.pop() == "x" and q.pop() == "z"
+
+try:
+    q.pop()
+    assert False
+except IndexError:
+    pass
+
+# Many priority changes agree with a brute force minimum
+random.seed(0)
+priorities = {}
+for i in range(5000):
+    item = random.randrange(200)
+    priority = random.random()
+    priorities[item] = priority
+    q.push(item, priority)
+    if random.random() < 0.3:
+        expected = min(priorities, key = lambda x: (priorities[x]))
+        assert q.pop() == expected
+        del priorities[expected]
+assert len(q) == len(priorities)
+assert len(q._heap) <= 2 * len(q) + 64 + 1
+print("q", sorted(q)[:10], "...")
@@ -0,0 +1,90 @@
+import random
+import numpy as np
+from puzzle import PuzzleGraph, PuzzleState
+from a_star_search import a_star_search
+from ida_star_search import ida_star_search
+from bidirectional_search import bidirectional_breadth_first_search, bidirectional_a_star_search
+
+graph = PuzzleGraph(3)
+start = graph.start_node()
+
+# Packing round-trips
+assert np.array_equal(start._state, np.asarray([ [2, 3, 0], [1, 4, 5], [7, 8, 6] ]))
+assert PuzzleState.pack(start._state) == (start._packed, start._blank)
+assert PuzzleState(PuzzleGraph.get_solved_state(3), graph) == graph._goal
+
+# Packed moves agree with sliding the pieces of an array around
+random.seed(0)
+state = start
+for i in range(200):
+    array = state._state
+    y, x = divmod(state._blank, 3)
+    for child in state.children():
+        expected = np.copy(array)
+        _y, _x = divmod(child._blank, 3)
+        expected[y, x], expected[_y, _x] = expected[_y, _x], 0
+        assert np.array_equal(child._state, expected)
+        assert hash(child) == hash(PuzzleState(expected, graph))
+    state = random.choice(state.children())
+
+assert state.cost() == 200
+assert [ (child.key(), child.backlink.edit_description, child.backlink.cost) for child in state.children() ] == [ (key, move[0], cost) for key, move, cost in state.successors() ]
+assert [ state.make_child(*successor)._packed for successor in state.successors() ] == [ child._packed for child in state.children() ]
+assert state.copy() == state and state.copy().backlink is None
+assert len(start.string.splitlines()) == 7
+print(state)
+
+# Children derive their heuristic from their parent; it has to match a from-scratch evaluation
+for heuristic in ("manhattan", "linear_conflict"):
+    graph = PuzzleGraph(3, heuristic = heuristic)
+    state = graph.start_node()
+    state.distance()
+    for i in range(500):
+        state = random.choice(state.children())
+        expected = state.manhattan_distance()
+        if heuristic == "linear_conflict":
+            expected += state.linear_conflicts()
+        assert state._h == expected
+    assert graph._goal.distance() == 0
+
+# The pattern database dominates Manhattan distance (each pattern's table counts at least its pieces' Manhattan moves)
+graph = PuzzleGraph(3, heuristic = "pdb")
+assert graph._goal.distance() == 0
+state = graph.start_node()
+for i in range(500):
+    state = random.choice(state.children())
+    assert state.distance() >= state.manhattan_distance()
+
+# Scoring a batch of boards at once agrees with scoring them one by one
+children = graph.start_node().children()
+assert PuzzleState.batch_distance(children) == [ graph._pattern_database.distance(PuzzleState.unpack(child._packed, 3)) for child in children ]
+
+# In-place moves are undone exactly, heuristic included
+graph = PuzzleGraph(3, heuristic = "linear_conflict")
+state = graph.start_node().copy()
+state.distance()
+before = (state._packed, state._blank, state._h)
+for move in state.moves():
+    state.undo(state.apply(move))
+    assert (state._packed, state._blank, state._h) == before
+
+# IDA* finds solutions as short as A*'s ...
+def solve(algorithm, *args):
+    algorithm = algorithm(*args)
+    next(algorithm)
+    for node, visited, queue in algorithm:
+        if node.is_goal():
+            return node
+
+for seed in range(3):
+    random.seed(seed)
+    start = graph._goal.copy()
+    start.shuffle(100)
+    shortest = len(solve(a_star_search, start).path())
+    assert len(solve(ida_star_search, start).path()) == shortest
+
+    # ... and so do both bidirectional searches, with a path that still runs from the goal back to the start
+    for algorithm in (bidirectional_breadth_first_search, bidirectional_a_star_search):
+        path = solve(algorithm, start, graph.goal_node()).path()
+        assert len(path) == shortest and path[-1] == start
+        assert all(a in b.children() for a, b in zip(path, path[1:]))
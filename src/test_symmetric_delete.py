@@ -0,0 +1,66 @@
+import os, random, tempfile
+from lexicon import write_lexicon, CompiledLexicon
+from autocorrect import String, StringGraph
+from symmetric_delete import SymmetricDeleteIndex, write_symmetric_delete_index, edit_script
+
+random.seed(0)
+alphabet = "abcde"
+
+def edits_within(query, budget, allowed):
+    # { string: fewest edits } for everything a breadth-first search applying String's edits one at a time reaches within budget
+    graph = StringGraph(query, allowed)
+    reached, layer = { query: 0 }, [ query ]
+    for edits in range(1, budget + 1):
+        next_layer = []
+        for string in layer:
+            for child, move, cost in String(string, graph)._edits(alphabet.upper()):
+                child = child.lower()
+                if child not in reached:
+                    reached[child] = edits
+                    next_layer.append(child)
+        layer = next_layer
+    return reached
+
+words = set("".join(random.choice(alphabet) for _ in range(random.randint(1, 6))) for _ in range(300))
+
+with tempfile.TemporaryDirectory() as directory:
+    write_lexicon(words, os.path.join(directory, "test.lexicon"))
+    lexicon = CompiledLexicon(os.path.join(directory, "test.lexicon"))
+    write_symmetric_delete_index(lexicon, os.path.join(directory, "test.symdelete"), max_edits = 2)
+    index = SymmetricDeleteIndex(os.path.join(directory, "test.symdelete"), words = lexicon)
+
+    for i in range(100):
+        query = "".join(random.choice(alphabet) for _ in range(random.randint(1, 7)))
+        allowed = random.choice([ "idt", "td", "id", "d" ])
+
+        # The index finds a word as near as the nearest one edits applied in sequence reach
+        reached = edits_within(query, 2, allowed)
+        nearest = min(([ (edits, word) for word, edits in reached.items() if word in words ]), default = None)
+        correction = index.correct(query, allowed_transitions = allowed)
+        assert (correction is None) == (nearest is None), query
+        if correction is None:
+            continue
+        assert len(correction[1]) == nearest[0], query
+
+        # Applying the moves in order spells the word, as a chain of Strings with the usual edit descriptions
+        goal = index.autocorrect(StringGraph(query, allowed).start_node())
+        assert goal.string.lower() == correction[0] and goal.path()[-1].string == query
+        assert [ node.backlink.edit_description for node in goal.path()[:-1] ] == [ String.describe(move) for move in reversed(correction[1]) ]
+
+    del index, lexicon
+
+    # An index built before its lexicon was rebuilt, even with as many words, is refused
+    renamed = sorted(words)[:-1] + [ "edcbae" ]
+    assert len(set(renamed)) == len(words)
+    write_lexicon(renamed, os.path.join(directory, "test.lexicon"))
+    try:
+        SymmetricDeleteIndex(os.path.join(directory, "test.symdelete"), words = CompiledLexicon(os.path.join(directory, "test.lexicon")))
+        assert False
+    except ValueError:
+        pass
+
+# A transposed pair can still be split by an insert, as a search would do it
+moves = edit_script("conmsers", "consumers", 2)
+assert len(moves) == 2 and String.edit(String.edit("conmsers", moves[0]), moves[1]).lower() == "consumers"
+
+print("ok")
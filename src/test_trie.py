@@ -0,0 +1,43 @@
+import random
+from trie import Trie
+from autocorrect import String, StringGraph
+
+random.seed(0)
+alphabet = "abcd"
+words = set("".join(random.choice(alphabet) for _ in range(random.randint(1, 6))) for _ in range(200))
+trie = Trie(words)
+assert len(trie) == len(words) and all(word in trie for word in words) and "abcdabcd" not in trie
+
+def edits_within(query, budget, allowed):
+    # { string: fewest edits } for everything a breadth-first search applying String's edits one at a time reaches within budget
+    graph = StringGraph(query, allowed)
+    reached, layer = { query: 0 }, [ query ]
+    for edits in range(1, budget + 1):
+        next_layer = []
+        for string in layer:
+            for child, move, cost in String(string, graph)._edits(alphabet.upper()):
+                child = child.lower()
+                if child not in reached:
+                    reached[child] = edits
+                    next_layer.append(child)
+        layer = next_layer
+    return reached
+
+# The trie walk finds exactly the words that edits applied in sequence reach (a transposed pair split by an insert, say),
+# and with transpositions but no inserts or deletes, at least those words and never more edits than they take
+for i in range(200):
+    query = "".join(random.choice(alphabet) for _ in range(random.randint(0, 7)))
+    budget = random.randint(0, 3)
+    allowed = random.choice([ "idt", "td", "id", "d", "t" ])
+    reached = edits_within(query, budget, allowed)
+    expected = { word: edits for word, edits in reached.items() if word in words }
+    found = trie.words_within(query, budget, allowed)
+    if allowed in ("idt", "id", "d"):
+        assert found == expected, (query, budget, allowed)
+        assert trie.within(query, budget, allowed) == (min(expected.values()) if expected else None)
+    else:
+        assert all(word in found and found[word] <= edits for word, edits in expected.items()), (query, budget, allowed)
+
+assert Trie([ "consumers" ]).within("conmsers", 2) == 2
+
+print("ok")
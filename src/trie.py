@@ -0,0 +1,126 @@
+from memoize import LRUCache
+
+# A trie over a word list, walked with one edit distance row per level (inserts, deletes and transpositions, applied
+# one after another as StringGraph applies them), abandoning a branch once it is over budget. Queries are memoized.
+
+END = ""
+
+
+class Trie:
+
+    # Memoized queries
+    CACHE_SIZE = 100000
+
+    def __init__(self, words = ()):
+        self._root = {}
+        self._count = 0
+        self._cache = LRUCache(Trie.CACHE_SIZE)
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        node = self._root
+        for letter in word:
+            node = node.setdefault(letter, {})
+        if END not in node:
+            node[END] = True
+            self._count += 1
+            self._cache.clear()
+
+    def __contains__(self, word):
+        node = self._root
+        for letter in word:
+            node = node.get(letter)
+            if node is None:
+                return False
+        return END in node
+
+    def __len__(self):
+        return self._count
+
+    def letters(self):
+        # Every letter used by any word
+        letters, stack = set(), [ self._root ]
+        while stack:
+            node = stack.pop()
+            for letter, child in node.items():
+                if letter != END:
+                    letters.add(letter)
+                    stack.append(child)
+        return letters
+
+    def within(self, string, budget, allowed_transitions = "idt"):
+        # Fewest edits from the string to any word (see words_within), or None if that is more than budget
+        nearby = self.words_within(string, budget, allowed_transitions)
+        return min(nearby.values()) if nearby else None
+
+    def words_within(self, string, budget, allowed_transitions = "idt"):
+
+        # { word: edits } for every word that may be at most budget edits from the string, where edits are applied one
+        # after another as a search applies them (so a transposed pair can still be split by an insert, say).
+        # With inserts, deletes and transpositions all allowed, or no transpositions, the edits are exact. Transpositions
+        # without inserts or deletes can move a letter further than the table can follow, so the table is then filled
+        # in as if all three were allowed, and the edits are only a lower bound: no word within budget is left out.
+        key = (string, budget, allowed_transitions)
+        found = self._cache.get(key)
+        if found is not None:
+            return found
+
+        transposes = "t" in allowed_transitions
+        if transposes:
+            inserts = deletes = True
+        else:
+            inserts, deletes = "i" in allowed_transitions, "d" in allowed_transitions
+        n, over = len(string), budget + 1
+
+        # A word can only be longer than the string with inserts, and shorter with deletes
+        shortest = 0 if "d" in allowed_transitions else n
+        longest  = None if "i" in allowed_transitions else n
+
+        # rows[i][j] is the cost of turning string[:j] into prefix[:i]; entries past the budget are clamped to budget + 1
+        first_row = [ min(j, over) if deletes else (0 if j == 0 else over) for j in range(n + 1) ]
+        found = {}
+        stack = [ (self._root, "", [ first_row ]) ]
+
+        while stack:
+
+            node, prefix, rows = stack.pop()
+            row = rows[-1]
+            depth = len(prefix)
+
+            if END in node and row[n] <= budget and shortest <= depth and (longest is None or depth <= longest):
+                found[prefix] = row[n]
+
+            # Lowrance-Wagner transpositions: the last row of the prefix holding each letter
+            last_row = { letter: i + 1 for i, letter in enumerate(prefix) }
+
+            for letter, child in node.items():
+
+                if letter == END:
+                    continue
+
+                new_row = [ min(row[0] + 1, over) if inserts else over ]
+                last_column = 0
+                for j in range(1, n + 1):
+                    best = row[j-1] if string[j-1] == letter else over
+                    if inserts and row[j] + 1 < best:
+                        best = row[j] + 1
+                    if deletes and new_row[j-1] + 1 < best:
+                        best = new_row[j-1] + 1
+                    if transposes:
+                        # string[l-1] and string[j-1] swap places to become prefix[i-1] (this letter) and prefix[k-1],
+                        # with the string's letters between them deleted and the prefix's inserted
+                        k, l = last_row.get(string[j-1], 0), last_column
+                        if k > 0 and l > 0:
+                            best = min(best, rows[k-1][l-1] + (depth - k) + 1 + (j - l - 1))
+                    if string[j-1] == letter:
+                        last_column = j
+                    new_row.append(min(best, over))
+
+                # A transposition can reach back past this row, but only by inserting a letter for every row it
+                # skips, and that costs no less than getting to this row does
+                if min(new_row) <= budget:
+                    stack.append((child, prefix + letter, rows + [ new_row ]))
+
+        self._cache[key] = found
+        return found
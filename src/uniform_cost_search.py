@@ -0,0 +1,43 @@
+from priority_queue import PriorityQueue
+
+
+def uniform_cost_search(start):
+
+    # Dijkstra's algorithm: always expand the cheapest node found so far, so the first goal popped is the
+    # cheapest. Path costs are kept in a dict by node.key() as they are discovered, rather than summed up along
+    # backlinks, and a child node is only built when its key is new or reached more cheaply.
+
+    if (yield) == -1:
+        return
+
+    costs   = { start.key(): 0 }
+    queue   = PriorityQueue()
+    queue.push(start, 0)
+
+    visited = {}
+
+    while len(queue) > 0:
+
+        node, cost = queue.pop_with_priority()
+        visited[node.key()] = node
+
+        if node.is_goal():
+            break
+
+        for key, move, move_cost in node.successors():
+
+            if key in visited:
+                continue
+
+            # Pushing an already queued child just lowers its priority (and keeps the cheaper backlink)
+            child_cost = cost + move_cost
+            if key not in costs or child_cost < costs[key]:
+                costs[key] = child_cost
+                queue.push(node.make_child(key, move, move_cost), child_cost)
+
+        # Coroutine hack to communicate algorithm state back to viz
+        if (yield node, visited.values(), queue) == -1:
+            return
+
+    # Coroutine hack to communicate algorithm state back to viz
+    yield node, visited.values(), queue